@@ -0,0 +1,180 @@
+import collections
+import dataclasses
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable
+
+log = logging.getLogger(__name__)
+
+
+class QueueFullPolicy(Enum):
+    """What `CallbackDispatcher.submit` does when a worker queue is full."""
+
+    BLOCK = 'block' # Wait for space (stalls the caller, like an inline callback)
+    DROP_NEWEST = 'drop_newest' # Discard the callback being submitted
+    DROP_OLDEST = 'drop_oldest' # Discard the oldest queued callback
+
+
+@dataclass
+class DispatchMetrics:
+    """Counters and timings of a CallbackDispatcher (times in seconds)."""
+
+    submitted: int = 0
+    completed: int = 0
+    dropped: int = 0
+    errors: int = 0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    total_wait: float = 0.0 # Time spent queued, submit -> start
+    max_wait: float = 0.0
+    total_run: float = 0.0 # Time spent running callbacks
+    max_run: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.completed if self.completed else 0.0
+
+    @property
+    def mean_run(self) -> float:
+        return self.total_run / self.completed if self.completed else 0.0
+
+
+class _Worker:
+    """One worker thread with its own bounded FIFO."""
+
+    def __init__(self, dispatcher: 'CallbackDispatcher', name: str):
+        self.queue = collections.deque()
+        self.thread = threading.Thread(target=dispatcher._work, args=(self,), name=name, daemon=True)
+
+
+class CallbackDispatcher:
+    """
+    Runs object dictionary callbacks off the canopen receive thread.
+
+    Callbacks are keyed by (index, subindex). All callbacks for the same key
+    go to the same worker and run in submission order; different keys are
+    spread over `workers` threads. Each worker queue holds at most
+    `max_queue` callbacks, beyond which `policy` applies. The default,
+    BLOCK, never loses a write side effect; the drop policies trade that
+    for a receive thread that never waits.
+
+    With `workers=0` callbacks run inline in `submit`, which keeps virtual
+    time simulations deterministic while still collecting metrics.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 64,
+                 policy: QueueFullPolicy = QueueFullPolicy.BLOCK,
+                 name: str = 'od-callbacks'):
+        """
+        :param workers: Number of worker threads (0 runs callbacks inline).
+        :param max_queue: Capacity of each worker queue.
+        :param policy: What to do when a worker queue is full.
+        :param name: Prefix for the worker thread names.
+        """
+        if max_queue < 1:
+            raise ValueError(f"max_queue must be at least 1, got {max_queue}")
+        self.max_queue = max_queue
+        self.policy = policy
+        self._lock = threading.Condition()
+        self._metrics = DispatchMetrics()
+        self._running = False
+        self._workers = [_Worker(self, f'{name}-{i}') for i in range(workers)]
+
+    def start(self):
+        with self._lock:
+            self._running = True
+        for worker in self._workers:
+            worker.thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """Run the callbacks still queued, then stop the workers."""
+        with self._lock:
+            self._running = False
+            self._lock.notify_all()
+        for worker in self._workers:
+            if worker.thread.is_alive():
+                worker.thread.join(timeout)
+                if worker.thread.is_alive():
+                    log.warning(f"Callback worker {worker.thread.name} did not stop cleanly.")
+
+    def metrics(self) -> DispatchMetrics:
+        """Return a snapshot of the dispatcher metrics."""
+        with self._lock:
+            return dataclasses.replace(self._metrics)
+
+    def submit(self, key: tuple[int, int], callback: Callable, *args, **kwargs) -> bool:
+        """
+        Queue `callback(*args, **kwargs)` for the object `key`.
+
+        :return: False if the callback was dropped, because the queue was full
+            or the dispatcher is not running.
+        """
+        submitted_at = time.monotonic()
+        if not self._workers:
+            with self._lock:
+                self._metrics.submitted += 1
+            self._run(callback, args, kwargs, submitted_at)
+            return True
+
+        worker = self._workers[hash(key) % len(self._workers)]
+        with self._lock:
+            self._metrics.submitted += 1
+            if self.policy is QueueFullPolicy.BLOCK:
+                while len(worker.queue) >= self.max_queue and self._running:
+                    self._lock.wait()
+            if not self._running:
+                # Workers are gone (or never started), nothing would run it
+                self._drop(key, 'dispatcher stopped')
+                return False
+            if len(worker.queue) >= self.max_queue:
+                if self.policy is QueueFullPolicy.DROP_NEWEST:
+                    self._drop(key, self.policy.value)
+                    return False
+                evicted_key = worker.queue.popleft()[0]
+                self._metrics.queue_depth -= 1
+                self._drop(evicted_key, self.policy.value)
+            worker.queue.append((key, callback, args, kwargs, submitted_at))
+            self._metrics.queue_depth += 1
+            self._metrics.max_queue_depth = max(self._metrics.max_queue_depth, self._metrics.queue_depth)
+            self._lock.notify_all()
+        return True
+
+    def _drop(self, key: tuple[int, int], reason: str):
+        """Record a dropped callback. Called with the lock held."""
+        self._metrics.dropped += 1
+        log.warning(f"Dropped a callback for 0x{key[0]:04X}:{key[1]:02X} ({reason}).")
+
+    def _work(self, worker: _Worker):
+        while True:
+            with self._lock:
+                while not worker.queue and self._running:
+                    self._lock.wait()
+                if not worker.queue:
+                    return
+                _, callback, args, kwargs, submitted_at = worker.queue.popleft()
+                self._metrics.queue_depth -= 1
+                self._lock.notify_all() # Wake submitters blocked on a full queue
+            self._run(callback, args, kwargs, submitted_at)
+
+    def _run(self, callback: Callable, args: tuple, kwargs: dict, submitted_at: float):
+        started_at = time.monotonic()
+        failed = False
+        try:
+            callback(*args, **kwargs)
+        except Exception as e:
+            failed = True
+            log.error(f"Error in object dictionary callback {callback}: {e}", exc_info=True)
+        finished_at = time.monotonic()
+
+        wait, run = started_at - submitted_at, finished_at - started_at
+        with self._lock:
+            metrics = self._metrics
+            metrics.completed += 1
+            metrics.errors += failed
+            metrics.total_wait += wait
+            metrics.max_wait = max(metrics.max_wait, wait)
+            metrics.total_run += run
+            metrics.max_run = max(metrics.max_run, run)
@@ -1,5 +1,8 @@
 import logging
+from typing import Optional
+
 from platform_canopen.simulated_node import SimulatedCanopenNode
+from platform_canopen.virtual_time import VirtualCanBus
 
 log = logging.getLogger(__name__)
 
@@ -17,9 +20,12 @@ class LoraNode(SimulatedCanopenNode):
     Listens for writes to Object 0x2000 (LoRa Control Register).
     """
 
-    def __init__(self, channel: str = 'vcan0'):
+    def __init__(self, channel: str = 'vcan0', virtual_bus: Optional[VirtualCanBus] = None,
+                 **kwargs):
+        # kwargs: callback dispatch options, see SimulatedCanopenNode
         super().__init__(
-            node_id=LORA_NODE_ID, od_path=LORA_EDS_PATH, channel=channel
+            node_id=LORA_NODE_ID, od_path=LORA_EDS_PATH, channel=channel,
+            virtual_bus=virtual_bus, **kwargs,
         )
         self.control_value = 0 # Internal state
 
@@ -32,6 +38,11 @@ class LoraNode(SimulatedCanopenNode):
         self.control_value = new_value
         # Add any logic here to react to the control value change
 
+    def _on_od_write(self, index, subindex, od, data):
+        """LocalNode write callback, forwards writes to the control register."""
+        if index == LORA_CONTROL_REGISTER_IDX:
+            self._on_control_write(od.decode_raw(data))
+
     def _post_start_setup(self):
         """Set up the SDO write callback for the control register."""
         try:
@@ -39,7 +50,7 @@ class LoraNode(SimulatedCanopenNode):
             # Store the initial value from OD
             self.control_value = control_reg_var.value
             # Add the callback
-            control_reg_var.add_callback(self._on_control_write)
+            self.add_write_callback(self._on_od_write)
             log.info(
                 f"LoRa Node (ID {self.node_id}): Callback added for Control Register (0x{LORA_CONTROL_REGISTER_IDX:04X})"
             )
@@ -1,5 +1,8 @@
 import logging
+from typing import Optional
+
 from platform_canopen.simulated_node import SimulatedCanopenNode
+from platform_canopen.virtual_time import VirtualCanBus
 
 log = logging.getLogger(__name__)
 
@@ -16,9 +19,12 @@ class ObcNode(SimulatedCanopenNode):
     Provides a readable status register (Object 0x2000).
     """
 
-    def __init__(self, channel: str = 'vcan0'):
+    def __init__(self, channel: str = 'vcan0', virtual_bus: Optional[VirtualCanBus] = None,
+                 **kwargs):
+        # kwargs: callback dispatch options, see SimulatedCanopenNode
         super().__init__(
-            node_id=OBC_NODE_ID, od_path=OBC_EDS_PATH, channel=channel
+            node_id=OBC_NODE_ID, od_path=OBC_EDS_PATH, channel=channel,
+            virtual_bus=virtual_bus, **kwargs,
         )
         # Internal state for the status register (can be updated if needed)
         self._status_value = 1 # Default to 1 (OK) as per XDC
@@ -3,6 +3,10 @@ import time
 import logging
 import os
 import threading # Import threading
+from typing import Optional
+
+from platform_canopen.callback_dispatch import CallbackDispatcher, DispatchMetrics, QueueFullPolicy
+from platform_canopen.virtual_time import VirtualCanBus
 
 log = logging.getLogger(__name__)
 
@@ -26,15 +30,33 @@ class SimulatedCanopenNode:
     """
     Base class for simulating a CANopen node using python-canopen.
     Includes manual heartbeat generation.
+
+    Runs in wall-clock time on a socketcan channel by default. When a
+    VirtualCanBus is given, the node instead runs in virtual time: the bus,
+    heartbeats and SDO callbacks are all driven by the bus scheduler.
+
+    OD write callbacks registered with add_write_callback() do not run on the
+    canopen receive thread; they are handed to a bounded CallbackDispatcher
+    so a slow handler cannot stall SDO responses or heartbeats.
     """
 
-    def __init__(self, node_id: int, od_path: str, channel: str = 'vcan0'):
+    def __init__(self, node_id: int, od_path: str, channel: str = 'vcan0',
+                 interface: str = 'socketcan',
+                 virtual_bus: Optional[VirtualCanBus] = None,
+                 callback_workers: int = 2, callback_queue_size: int = 64,
+                 queue_full_policy: QueueFullPolicy = QueueFullPolicy.BLOCK):
         """
         Initializes the simulated node.
 
         :param node_id: The CANopen Node ID for this device.
         :param od_path: Path to the OD file (EDS/DCF/EPF) describing the node.
-        :param channel: The socketcan channel to use (e.g., 'vcan0').
+        :param channel: The CAN channel to use (e.g., 'vcan0').
+        :param interface: The python-can interface of `channel`.
+        :param virtual_bus: Virtual-time bus to attach to instead of socketcan.
+        :param callback_workers: Worker threads for OD write callbacks. On a
+            virtual bus callbacks always run inline to stay deterministic.
+        :param callback_queue_size: Pending callbacks per worker.
+        :param queue_full_policy: What to do when a worker queue is full.
         """
         if not os.path.exists(od_path):
             raise FileNotFoundError(f"OD file not found: {od_path}")
@@ -42,43 +64,57 @@ class SimulatedCanopenNode:
         self.node_id = node_id
         self.od_path = od_path
         self.channel = channel
+        self.interface = interface
+        self.virtual_bus = virtual_bus
         self.network = None
         self.node = None
 
+        # OD write callback dispatch
+        self.callback_workers = callback_workers
+        self.callback_queue_size = callback_queue_size
+        self.queue_full_policy = queue_full_policy
+        self.dispatcher = None
+        self._write_callbacks = []
+
         # Heartbeat control
         self.heartbeat_ms = 0
         self.heartbeat_thread = None
         self.stop_event = threading.Event() # Event to signal thread termination
+        self.heartbeat_event = None # Next heartbeat in virtual time
 
         log.info(
             f"Initializing Node ID {self.node_id} with {self.od_path} on {self.channel}"
         )
 
+    def _send_heartbeat(self) -> bool:
+        """
+        Sends a single heartbeat with the current NMT state.
+
+        :return: False if the heartbeat could not be sent.
+        """
+        try:
+            # Get current NMT state byte
+            current_state_str = self.node.nmt_state
+            state_byte = NMT_STATE_TO_BYTE.get(current_state_str, 0x00) # Default to 0 if unknown
+
+            # Send heartbeat message
+            if self.network and self.network.bus is not None:
+                 self.network.send_message(0x700 + self.node_id, [state_byte])
+                 # log.debug(f"Node ID {self.node_id}: Sent heartbeat (State: {current_state_str} / 0x{state_byte:02X})")
+                 return True
+            log.warning(f"Node ID {self.node_id}: Network not connected, skipping heartbeat.")
+        except Exception as e:
+            log.error(f"Node ID {self.node_id}: Error sending heartbeat: {e}", exc_info=True)
+        return False
+
     def _heartbeat_producer_task(self):
         """Task executed by the heartbeat thread."""
         log.info(f"Node ID {self.node_id}: Heartbeat thread started (Interval: {self.heartbeat_ms} ms).")
-        heartbeat_cob_id = 0x700 + self.node_id
         interval_sec = self.heartbeat_ms / 1000.0
 
         while not self.stop_event.is_set():
-            try:
-                # Get current NMT state byte
-                current_state_str = self.node.nmt_state
-                state_byte = NMT_STATE_TO_BYTE.get(current_state_str, 0x00) # Default to 0 if unknown
-
-                # Send heartbeat message
-                if self.network: # and self.network.is_connected:
-                     self.network.send_message(heartbeat_cob_id, [state_byte])
-                     # log.debug(f"Node ID {self.node_id}: Sent heartbeat (State: {current_state_str} / 0x{state_byte:02X})")
-                else:
-                    log.warning(f"Node ID {self.node_id}: Network not connected, skipping heartbeat.")
-                    # Avoid busy-loop if network disconnects unexpectedly
-                    self.stop_event.wait(interval_sec)
-                    continue
-
-            except Exception as e:
-                log.error(f"Node ID {self.node_id}: Error in heartbeat thread: {e}", exc_info=True)
-                # Avoid busy-loop on repeated errors
+            if not self._send_heartbeat():
+                # Avoid busy-loop if network disconnects or on repeated errors
                 self.stop_event.wait(interval_sec)
 
             # Wait for the next interval, checking stop_event periodically
@@ -86,6 +122,15 @@ class SimulatedCanopenNode:
 
         log.info(f"Node ID {self.node_id}: Heartbeat thread stopped.")
 
+    def _virtual_heartbeat_tick(self):
+        """Heartbeat producer in virtual time, rescheduling itself like the thread loop."""
+        interval_sec = self.heartbeat_ms / 1000.0
+        if not self._send_heartbeat():
+            interval_sec *= 2
+        self.heartbeat_event = self.virtual_bus.scheduler.call_later(
+            interval_sec, self._virtual_heartbeat_tick
+        )
+
 
     def start(self):
         """
@@ -96,13 +141,27 @@ class SimulatedCanopenNode:
         self.stop_event.clear() # Ensure event is clear before starting
 
         try:
-            # Add the local node using the OD file
-            self.node = self.network.add_node(self.node_id, self.od_path)
+            # Create the local node (with its SDO server) using the OD file
+            self.node = self.network.create_node(self.node_id, self.od_path)
             log.info(f"Node ID {self.node_id} added to network.")
 
+            # Hand OD write callbacks to worker threads
+            self.dispatcher = CallbackDispatcher(
+                workers=0 if self.virtual_bus is not None else self.callback_workers,
+                max_queue=self.callback_queue_size,
+                policy=self.queue_full_policy,
+                name=f'node-{self.node_id}-callbacks',
+            )
+            self.dispatcher.start()
+            self.node.add_write_callback(self._dispatch_write)
+
             # Connect to the CAN bus
-            self.network.connect(bustype='socketcan', channel=self.channel)
-            log.info(f"Node ID {self.node_id} connected to {self.channel}.")
+            if self.virtual_bus is not None:
+                self.virtual_bus.connect(self.network)
+                log.info(f"Node ID {self.node_id} connected to virtual bus {self.virtual_bus.name}.")
+            else:
+                self.network.connect(interface=self.interface, channel=self.channel)
+                log.info(f"Node ID {self.node_id} connected to {self.channel}.")
 
             # Set the NMT state of the local node to OPERATIONAL
             self.node.nmt_state = 'OPERATIONAL'
@@ -137,7 +196,12 @@ class SimulatedCanopenNode:
                 self.heartbeat_ms = int(od_value) if od_value is not None else 0
 
                 # Now check the potentially updated self.heartbeat_ms
-                if self.heartbeat_ms > 0:
+                if self.heartbeat_ms > 0 and self.virtual_bus is not None:
+                    log.info(f"Node ID {self.node_id}: Scheduling heartbeat with interval {self.heartbeat_ms} ms.")
+                    self.heartbeat_event = self.virtual_bus.scheduler.call_later(
+                        0, self._virtual_heartbeat_tick
+                    )
+                elif self.heartbeat_ms > 0:
                     log.info(f"Node ID {self.node_id}: Starting heartbeat thread with interval {self.heartbeat_ms} ms.")
                     self.heartbeat_thread = threading.Thread(
                         target=self._heartbeat_producer_task, daemon=True
@@ -158,8 +222,33 @@ class SimulatedCanopenNode:
             log.error(f"Error starting Node ID {self.node_id}: {e}", exc_info=True) # Log traceback
             if self.network:
                 self.network.disconnect()
+            if self.dispatcher is not None:
+                self.dispatcher.stop()
             raise
 
+    def add_write_callback(self, callback):
+        """
+        Registers `callback(index, subindex, od, data)` for OD writes.
+        It runs on a dispatcher worker; writes to the same object are passed
+        to it in the order they were received. Can be called before or after
+        start(); registrations are kept across restarts, and registering the
+        same callback again has no effect.
+        """
+        if callback not in self._write_callbacks:
+            self._write_callbacks.append(callback)
+
+    def _dispatch_write(self, index, subindex, od, data):
+        """LocalNode write callback, runs on the canopen receive thread."""
+        for callback in self._write_callbacks:
+            self.dispatcher.submit(
+                (index, subindex), callback,
+                index=index, subindex=subindex, od=od, data=bytes(data),
+            )
+
+    def callback_metrics(self) -> Optional[DispatchMetrics]:
+        """Queue depth and latency metrics of the OD callback dispatcher."""
+        return self.dispatcher.metrics() if self.dispatcher else None
+
     def _post_start_setup(self):
         """
         Placeholder for derived classes to add specific setup logic
@@ -167,9 +256,12 @@ class SimulatedCanopenNode:
         """
         pass
 
-    def run(self):
+    def run(self, duration: Optional[float] = None):
         """
         Runs the main loop, keeping the node alive.
+
+        :param duration: Stop after this many seconds (virtual seconds on a
+            virtual bus). Runs until stopped if not given.
         """
         if not self.network or not self.node:
             log.error(f"Node ID {self.node_id} not started. Call start() first.")
@@ -177,8 +269,21 @@ class SimulatedCanopenNode:
 
         log.info(f"Node ID {self.node_id} running. Press Ctrl+C to stop.")
         try:
+            if self.virtual_bus is not None:
+                # Drive the scheduler ourselves, no time passes between events
+                scheduler = self.virtual_bus.scheduler
+                end_time = None if duration is None else scheduler.time() + duration
+                while not self.stop_event.is_set() and scheduler.step(end_time):
+                    pass
+                if end_time is not None and not self.stop_event.is_set():
+                    scheduler.run(until=end_time) # Nothing left to run, just advance the clock
+                return
+
             # Keep main thread alive. Heartbeat runs in separate thread.
+            end_time = None if duration is None else time.monotonic() + duration
             while not self.stop_event.is_set():
+                if end_time is not None and time.monotonic() >= end_time:
+                    break
                 # Can add other periodic checks here if needed
                 time.sleep(0.5) # Sleep a bit, but check stop_event reasonably often
         except KeyboardInterrupt:
@@ -193,6 +298,9 @@ class SimulatedCanopenNode:
         log.info(f"Initiating stop sequence for Node ID {self.node_id}...")
         # Signal the heartbeat thread to stop
         self.stop_event.set()
+        if self.heartbeat_event is not None:
+            self.heartbeat_event.cancel()
+            self.heartbeat_event = None
 
         # Wait for the heartbeat thread to finish
         if self.heartbeat_thread and self.heartbeat_thread.is_alive():
@@ -205,7 +313,7 @@ class SimulatedCanopenNode:
         self.heartbeat_thread = None # Clear the thread object
 
         # Disconnect from network
-        if self.network and self.network.is_connected:
+        if self.network and self.network.bus is not None:
             log.info(f"Disconnecting Node ID {self.node_id} from CAN bus...")
             # Optionally send NMT Reset Node before disconnecting (as was happening before)
             # Note: Sending requires the network to be connected.
@@ -226,6 +334,10 @@ class SimulatedCanopenNode:
         else:
              log.info(f"Node ID {self.node_id}: Already disconnected or network not initialized.")
 
+        # Run callbacks still queued, no new writes can arrive now
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+
         self.network = None
         self.node = None
         log.info(f"Node ID {self.node_id} stop sequence complete.")
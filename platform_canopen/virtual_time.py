@@ -0,0 +1,250 @@
+import heapq
+import itertools
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import can
+import canopen
+from can.broadcastmanager import ModifiableCyclicTaskABC
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BITRATE = 1_000_000
+
+
+@dataclass(order=True)
+class ScheduledEvent:
+    """A callback scheduled at a point in virtual time."""
+
+    time: float
+    seq: int
+    callback: Callable = field(compare=False)
+    args: tuple = field(compare=False, default=())
+    cancelled: bool = field(compare=False, default=False)
+
+    def cancel(self):
+        """Prevent the callback from running. Safe to call more than once."""
+        self.cancelled = True
+
+
+class EventScheduler:
+    """
+    Discrete-event scheduler driving a simulation in virtual time.
+
+    Time only advances when the next event is taken from the queue, so a
+    simulated day of heartbeats runs as fast as the callbacks allow.
+    Events scheduled for the same time run in the order they were added.
+    """
+
+    def __init__(self, start_time: float = 0.0):
+        """
+        :param start_time: Virtual time (in seconds) the simulation starts at.
+        """
+        self._now = start_time
+        self._queue: list[ScheduledEvent] = []
+        self._seq = itertools.count()
+
+    def time(self) -> float:
+        """Current virtual time in seconds."""
+        return self._now
+
+    def call_at(self, when: float, callback: Callable, *args) -> ScheduledEvent:
+        """Schedule `callback(*args)` at virtual time `when`."""
+        event = ScheduledEvent(max(when, self._now), next(self._seq), callback, args)
+        heapq.heappush(self._queue, event)
+        return event
+
+    def call_later(self, delay: float, callback: Callable, *args) -> ScheduledEvent:
+        """Schedule `callback(*args)` `delay` seconds from now."""
+        return self.call_at(self._now + delay, callback, *args)
+
+    def step(self, until: Optional[float] = None) -> bool:
+        """
+        Run the next pending event if it is due no later than `until`.
+
+        :return: False if there was no such event.
+        """
+        while self._queue and self._queue[0].cancelled:
+            heapq.heappop(self._queue)
+        if not self._queue or (until is not None and self._queue[0].time > until):
+            return False
+
+        event = heapq.heappop(self._queue)
+        self._now = event.time
+        try:
+            event.callback(*event.args)
+        except Exception as e:
+            log.error(f"Error in scheduled callback {event.callback}: {e}", exc_info=True)
+        return True
+
+    def run(self, until: Optional[float] = None):
+        """
+        Run events until the queue is empty or virtual time reaches `until`.
+        """
+        while self.step(until):
+            pass
+        if until is not None and until > self._now:
+            self._now = until
+
+
+class _VirtualCyclicTask(ModifiableCyclicTaskABC):
+    """Periodic transmission driven by the scheduler (used by NMT heartbeats)."""
+
+    def __init__(self, endpoint: 'VirtualBusEndpoint', message: can.Message, period: float):
+        super().__init__(message, period)
+        self._endpoint = endpoint
+        self._event = endpoint.scheduler.call_later(0, self._tick)
+
+    def _tick(self):
+        self._endpoint.send(self.messages[0])
+        self._event = self._endpoint.scheduler.call_later(self.period, self._tick)
+
+    def stop(self):
+        self._event.cancel()
+
+
+class VirtualBusEndpoint(can.BusABC):
+    """
+    A python-can bus object connecting one canopen Network to a VirtualCanBus.
+    Received frames are fed straight into `Network.notify`, no Notifier
+    thread is involved.
+    """
+
+    def __init__(self, bus: 'VirtualCanBus', network: canopen.Network):
+        super().__init__(channel=bus.name)
+        self.channel_info = f'Virtual CAN bus {bus.name!r}'
+        self.virtual_bus = bus
+        self.network = network
+        self.scheduler = bus.scheduler
+
+    def send(self, msg: can.Message, timeout: Optional[float] = None):
+        self.virtual_bus.transmit(self, msg)
+
+    def _recv_internal(self, timeout):
+        return None, False
+
+    def _send_periodic_internal(self, msgs, period, duration=None, autostart=True,
+                                modifier_callback=None):
+        return _VirtualCyclicTask(self, msgs, period)
+
+    def deliver(self, msg: can.Message):
+        if msg.is_error_frame or msg.is_remote_frame:
+            return
+        try:
+            self.network.notify(msg.arbitration_id, msg.data, msg.timestamp)
+        except Exception as e:
+            # Same as canopen's MessageListener: callbacks must not stop the bus
+            log.error(f"Error handling frame 0x{msg.arbitration_id:X}: {e}")
+
+    def shutdown(self):
+        self.virtual_bus.detach(self)
+        super().shutdown()
+
+
+class VirtualCanBus:
+    """
+    A CAN bus simulated in virtual time.
+
+    Frames are serialized like on a real bus: each one occupies the bus for
+    its transmission time at `bitrate` and is delivered to every other
+    endpoint when the transmission ends, plus an optional receive latency.
+    """
+
+    def __init__(self, scheduler: Optional[EventScheduler] = None,
+                 name: str = 'vcan0', bitrate: int = DEFAULT_BITRATE,
+                 latency: float = 0.0):
+        """
+        :param scheduler: Scheduler driving the bus, a new one if not given.
+        :param name: Channel name reported by the bus endpoints.
+        :param bitrate: Bit rate used to compute frame transmission times.
+        :param latency: Delay between the end of a transmission and its
+            delivery to the receivers (driver and stack processing time).
+        """
+        self.scheduler = scheduler or EventScheduler()
+        self.name = name
+        self.bitrate = bitrate
+        self.latency = latency
+        self.endpoints: list[VirtualBusEndpoint] = []
+        self.listeners: list[Callable[[can.Message], None]] = []
+        self._busy_until = self.scheduler.time()
+
+    def connect(self, network: canopen.Network) -> VirtualBusEndpoint:
+        """Attach a canopen Network to this bus."""
+        endpoint = VirtualBusEndpoint(self, network)
+        network.bus = endpoint
+        self.endpoints.append(endpoint)
+        return endpoint
+
+    def detach(self, endpoint: VirtualBusEndpoint):
+        if endpoint in self.endpoints:
+            self.endpoints.remove(endpoint)
+
+    def add_listener(self, callback: Callable[[can.Message], None]):
+        """Call `callback(msg)` for every frame that completes on the bus."""
+        self.listeners.append(callback)
+
+    def frame_time(self, msg: can.Message) -> float:
+        """Approximate time a frame occupies the bus, without bit stuffing."""
+        overhead_bits = 64 if msg.is_extended_id else 44
+        return (overhead_bits + 8 * len(msg.data)) / self.bitrate
+
+    def transmit(self, sender: VirtualBusEndpoint, msg: can.Message):
+        start = max(self.scheduler.time(), self._busy_until)
+        self._busy_until = start + self.frame_time(msg)
+        self.scheduler.call_at(self._busy_until, self._complete, sender, msg)
+
+    def _complete(self, sender: VirtualBusEndpoint, msg: can.Message):
+        frame = can.Message(
+            timestamp=self.scheduler.time(),
+            arbitration_id=msg.arbitration_id,
+            is_extended_id=msg.is_extended_id,
+            is_remote_frame=msg.is_remote_frame,
+            data=msg.data,
+            channel=self.name,
+        )
+        for listener in self.listeners:
+            listener(frame)
+        if self.latency > 0:
+            self.scheduler.call_later(self.latency, self._deliver, sender, frame)
+        else:
+            self._deliver(sender, frame)
+
+    def _deliver(self, sender: VirtualBusEndpoint, frame: can.Message):
+        for endpoint in list(self.endpoints):
+            if endpoint is not sender:
+                endpoint.deliver(frame)
+
+
+if __name__ == '__main__':
+    # Example: 24 h of heartbeats from all simulated nodes in virtual time
+    import argparse
+    import time
+    from collections import Counter
+
+    from platform_canopen.lora_node import LoraNode
+    from platform_canopen.obc_node import ObcNode
+
+    parser = argparse.ArgumentParser(description='Run the node simulation in virtual time')
+    parser.add_argument('--hours', type=float, default=24.0, help='Simulated duration (default: 24)')
+    args = parser.parse_args()
+
+    logging.getLogger('platform_canopen').setLevel(logging.WARNING)
+    bus = VirtualCanBus()
+    frames = Counter()
+    bus.add_listener(lambda msg: frames.update([msg.arbitration_id]))
+
+    nodes = [LoraNode(virtual_bus=bus), ObcNode(virtual_bus=bus)]
+    for node in nodes:
+        node.start()
+
+    started = time.perf_counter()
+    bus.scheduler.run(until=args.hours * 3600)
+    elapsed = time.perf_counter() - started
+
+    for node in nodes:
+        node.stop()
+
+    print(f'Simulated {args.hours:g} h in {elapsed:.2f} s of wall time')
+    for can_id, count in sorted(frames.items()):
+        print(f'  0x{can_id:03X}: {count} frames')
@@ -0,0 +1,486 @@
+"""
+Sharded Capture Decoding Pipeline
+
+Decodes large candump log captures (`candump -l` format) in parallel. Each
+capture is split into chunks at line (frame) boundaries, chunks are decoded
+in a process pool whose workers load the CAN database once, and the results
+are merged in timestamp order into a columnar output directory:
+
+    <output>/manifest.json
+    <output>/<message name>/timestamp.f64
+    <output>/<message name>/<signal name>.f64
+
+Every column is a flat little-endian float64 array, one row per frame.
+Decoded chunks are kept in `<output>/.parts` until the merge completes, so an
+interrupted run picks up where it left off when started again.
+"""
+
+import heapq
+import json
+import os
+import shutil
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from typing import Any, Iterator, Optional
+
+import cantools
+
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024  # bytes of capture text per chunk
+PARTS_DIR = ".parts"
+COLUMN_SUFFIX = ".f64"
+MERGE_BATCH_ROWS = 64 * 1024  # rows read from / written to a column at once
+
+# Database loaded once per worker process by `_init_worker`
+_worker_db: Optional[cantools.database.Database] = None
+
+
+@dataclass(frozen=True)
+class CaptureChunk:
+    """A byte range of a capture file starting and ending on line bounds."""
+
+    index: int
+    path: str
+    start: int
+    end: int
+
+
+def plan_chunks(
+    capture_paths: list[str], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> list[CaptureChunk]:
+    """Split capture files into chunks that never cut a frame in half."""
+    chunks = []
+    for path in capture_paths:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            start = 0
+            while start < size:
+                f.seek(min(start + chunk_size, size))
+                f.readline()  # move on to the next frame boundary
+                end = min(f.tell(), size)
+                chunks.append(CaptureChunk(len(chunks), path, start, end))
+                start = end
+    return chunks
+
+
+def parse_candump_line(line: bytes) -> Optional[tuple[float, int, bytes]]:
+    """
+    Parse one `candump -l` line into (timestamp, frame ID, payload).
+
+    Classic (`ID#DATA`) and CAN-FD (`ID##FDATA`) frames are supported.
+    Returns None for blank lines, remote frames and malformed input.
+    """
+    fields = line.split()
+    if len(fields) < 3:
+        return None
+    try:
+        timestamp = float(fields[0][1:-1])
+        frame_id, _, data = fields[2].partition(b"#")
+        if data.startswith(b"#"):
+            data = data[2:]  # skip the CAN-FD flags nibble
+        if data.startswith(b"R"):
+            return None
+        return timestamp, int(frame_id, 16), bytes.fromhex(data.decode())
+    except ValueError:
+        return None
+
+
+def _init_worker(dbc_path: str) -> None:
+    global _worker_db
+    _worker_db = cantools.database.load_file(dbc_path)
+
+
+def decode_chunk(chunk: CaptureChunk) -> dict[str, Any]:
+    """
+    Decode all frames of a chunk in the worker process.
+
+    Returns a dictionary with the number of frames that could not be
+    decoded under "skipped" and, under "messages", one dictionary of column
+    arrays per message name, sorted by timestamp.
+    """
+    db = _worker_db
+    message_cache: dict[int, Any] = {}
+    columns: dict[str, dict[str, array]] = {}
+    skipped = 0
+
+    with open(chunk.path, "rb") as f:
+        f.seek(chunk.start)
+        pos = chunk.start
+        while pos < chunk.end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+
+            frame = parse_candump_line(line)
+            if frame is None:
+                skipped += 1
+                continue
+            timestamp, frame_id, data = frame
+
+            if frame_id not in message_cache:
+                try:
+                    message_cache[frame_id] = db.get_message_by_frame_id(
+                        frame_id
+                    )
+                except KeyError:
+                    message_cache[frame_id] = None
+            message = message_cache[frame_id]
+            if message is None:
+                skipped += 1
+                continue
+
+            try:
+                decoded = message.decode(data, decode_choices=False)
+            except Exception:
+                skipped += 1
+                continue
+
+            table = columns.get(message.name)
+            if table is None:
+                table = columns[message.name] = {"timestamp": array("d")}
+                for signal in message.signals:
+                    table[signal.name] = array("d")
+            table["timestamp"].append(timestamp)
+            for signal in message.signals:
+                table[signal.name].append(decoded[signal.name])
+
+    for name, table in columns.items():
+        timestamps = table["timestamp"]
+        if any(a > b for a, b in zip(timestamps, timestamps[1:])):
+            order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+            columns[name] = {
+                column: array("d", (values[i] for i in order))
+                for column, values in table.items()
+            }
+
+    return {"skipped": skipped, "messages": columns}
+
+
+def _write_columns(directory: str, table: dict[str, array]) -> None:
+    os.makedirs(directory, exist_ok=True)
+    for column, values in table.items():
+        if sys.byteorder != "little":
+            values = array("d", values)
+            values.byteswap()
+        with open(os.path.join(directory, column + COLUMN_SUFFIX), "wb") as f:
+            values.tofile(f)
+
+
+def _read_column(directory: str, column: str) -> array:
+    values = array("d")
+    with open(os.path.join(directory, column + COLUMN_SUFFIX), "rb") as f:
+        values.frombytes(f.read())
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _read_column_slice(
+    directory: str, column: str, start: int, count: int
+) -> array:
+    values = array("d")
+    with open(os.path.join(directory, column + COLUMN_SUFFIX), "rb") as f:
+        f.seek(start * values.itemsize)
+        values.frombytes(f.read(count * values.itemsize))
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _save_part(parts_dir: str, index: int, result: dict[str, Any]) -> None:
+    """Persist a decoded chunk; the final rename marks it as complete."""
+    final_dir = os.path.join(parts_dir, f"{index:06d}")
+    tmp_dir = final_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    info = {"skipped": result["skipped"], "messages": {}}
+    for name, table in result["messages"].items():
+        _write_columns(os.path.join(tmp_dir, name), table)
+        timestamps = table["timestamp"]
+        info["messages"][name] = {
+            "rows": len(timestamps),
+            "first": timestamps[0],
+            "last": timestamps[-1],
+            "columns": list(table),
+        }
+    with open(os.path.join(tmp_dir, "part.json"), "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    os.rename(tmp_dir, final_dir)
+
+
+def _file_state(path: str) -> list:
+    """Path, size and modification time, to detect changed inputs."""
+    stat = os.stat(path)
+    return [path, stat.st_size, stat.st_mtime_ns]
+
+
+def _load_plan(
+    parts_dir: str,
+    capture_paths: list[str],
+    chunk_size: int,
+    dbc_path: str,
+) -> list[CaptureChunk]:
+    """Reuse the chunk plan of an interrupted run, or start a new one."""
+    plan_path = os.path.join(parts_dir, "plan.json")
+    expected = {
+        "captures": [_file_state(path) for path in capture_paths],
+        "dbc": _file_state(os.path.abspath(dbc_path)),
+        "chunk_size": chunk_size,
+    }
+    if os.path.exists(plan_path):
+        with open(plan_path, encoding="utf-8") as f:
+            plan = json.load(f)
+        if {k: plan.get(k) for k in expected} == expected:
+            return [CaptureChunk(**chunk) for chunk in plan["chunks"]]
+        # Different or modified inputs, the old parts are of no use
+        shutil.rmtree(parts_dir)
+
+    os.makedirs(parts_dir, exist_ok=True)
+    chunks = plan_chunks(capture_paths, chunk_size)
+    with open(plan_path, "w", encoding="utf-8") as f:
+        json.dump({**expected, "chunks": [asdict(c) for c in chunks]}, f)
+    return chunks
+
+
+def _iter_slices(
+    directory: str, columns: list[str], rows: int
+) -> Iterator[dict[str, array]]:
+    """A part's columns in slices of at most MERGE_BATCH_ROWS rows."""
+    for start in range(0, rows, MERGE_BATCH_ROWS):
+        yield {
+            c: _read_column_slice(directory, c, start, MERGE_BATCH_ROWS)
+            for c in columns
+        }
+
+
+def _iter_rows(
+    run: list[tuple[str, dict[str, Any]]], columns: list[str]
+) -> Iterator[tuple[float, ...]]:
+    """Rows of consecutive, non-overlapping parts, one slice at a time."""
+    for directory, info in run:
+        for table in _iter_slices(directory, columns, info["rows"]):
+            yield from zip(*(table[c] for c in columns))
+
+
+def _merge_message(
+    name: str,
+    parts: list[tuple[str, dict[str, Any]]],
+    output_dir: str,
+) -> int:
+    """
+    Append one message's rows from all parts to its output columns in
+    timestamp order. Parts that do not overlap in time are copied as they
+    are; only overlapping ones (e.g. parallel captures) are interleaved.
+
+    Memory use does not depend on the size of the captures: columns are
+    read and written in slices of MERGE_BATCH_ROWS rows, and overlapping
+    parts are chained into runs that do not overlap among themselves, so
+    the merge only holds one slice per run (about one per parallel capture).
+    """
+    message_dir = os.path.join(output_dir, name)
+    shutil.rmtree(message_dir, ignore_errors=True)
+    os.makedirs(message_dir)
+    columns = parts[0][1]["columns"]
+    files = {
+        c: open(os.path.join(message_dir, c + COLUMN_SUFFIX), "wb")
+        for c in columns
+    }
+
+    def write(table: dict[str, array]) -> None:
+        for column, values in table.items():
+            if sys.byteorder != "little":
+                values.byteswap()
+            values.tofile(files[column])
+
+    def flush(group: list[tuple[str, dict[str, Any]]]) -> None:
+        runs: list[list[tuple[str, dict[str, Any]]]] = []
+        for part in group:
+            for run in runs:
+                if part[1]["first"] >= run[-1][1]["last"]:
+                    run.append(part)
+                    break
+            else:
+                runs.append([part])
+
+        if len(runs) == 1:
+            for directory, info in runs[0]:
+                for table in _iter_slices(directory, columns, info["rows"]):
+                    write(table)
+            return
+
+        rows = heapq.merge(
+            *(_iter_rows(run, columns) for run in runs),
+            key=lambda row: row[0],
+        )
+        table = {c: array("d") for c in columns}
+        for row in rows:
+            for column, value in zip(columns, row):
+                table[column].append(value)
+            if len(table[columns[0]]) >= MERGE_BATCH_ROWS:
+                write(table)
+                table = {c: array("d") for c in columns}
+        write(table)
+
+    try:
+        parts = sorted(parts, key=lambda part: part[1]["first"])
+        group: list[tuple[str, dict[str, Any]]] = []
+        group_last = float("-inf")
+        for part_dir, info in parts:
+            if group and info["first"] >= group_last:
+                flush(group)
+                group = []
+            group.append((part_dir, info))
+            group_last = max(group_last, info["last"])
+        if group:
+            flush(group)
+    finally:
+        for f in files.values():
+            f.close()
+
+    return sum(info["rows"] for _, info in parts)
+
+
+def decode_captures(
+    capture_paths: list[str],
+    output_dir: str,
+    dbc_path: str = "wust-sat.dbc",
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict[str, Any]:
+    """
+    Decode candump captures in parallel into a columnar output directory.
+
+    Args:
+        capture_paths: Capture files to decode.
+        output_dir: Directory for the columnar output.
+        dbc_path: Path to the DBC file used for decoding.
+        workers: Number of worker processes (defaults to the CPU count).
+        chunk_size: Approximate number of capture bytes per chunk.
+
+    Returns:
+        The manifest written to `output_dir/manifest.json`.
+    """
+    capture_paths = [os.path.abspath(p) for p in capture_paths]
+    parts_dir = os.path.join(output_dir, PARTS_DIR)
+    chunks = _load_plan(parts_dir, capture_paths, chunk_size, dbc_path)
+
+    pending = [
+        chunk
+        for chunk in chunks
+        if not os.path.isdir(os.path.join(parts_dir, f"{chunk.index:06d}"))
+    ]
+    if pending:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(dbc_path,),
+        ) as pool:
+            futures = {pool.submit(decode_chunk, c): c for c in pending}
+            for future in as_completed(futures):
+                _save_part(parts_dir, futures[future].index, future.result())
+
+    skipped = 0
+    parts_by_message: dict[str, list[tuple[str, dict[str, Any]]]] = {}
+    for chunk in chunks:
+        part_dir = os.path.join(parts_dir, f"{chunk.index:06d}")
+        with open(os.path.join(part_dir, "part.json"), encoding="utf-8") as f:
+            info = json.load(f)
+        skipped += info["skipped"]
+        for name, message_info in info["messages"].items():
+            parts_by_message.setdefault(name, []).append(
+                (os.path.join(part_dir, name), message_info)
+            )
+
+    manifest: dict[str, Any] = {"skipped_frames": skipped, "messages": {}}
+    for name, parts in parts_by_message.items():
+        rows = _merge_message(name, parts, output_dir)
+        manifest["messages"][name] = {
+            "rows": rows,
+            "columns": parts[0][1]["columns"],
+        }
+
+    with open(
+        os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8"
+    ) as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(parts_dir)
+    return manifest
+
+
+def read_column(output_dir: str, message_name: str, column: str) -> array:
+    """Load one column of a decoded message from the columnar output."""
+    return _read_column(os.path.join(output_dir, message_name), column)
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+    import time
+
+    from platform_dbc.message_types import MessageType
+    from platform_dbc.modules import get_active_modules
+
+    parser = argparse.ArgumentParser(
+        description="Decode candump captures or benchmark pipeline scaling"
+    )
+    parser.add_argument("captures", nargs="*", help="candump -l log files")
+    parser.add_argument("--output", default="decoded")
+    parser.add_argument("--dbc", default="wust-sat.dbc")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--benchmark",
+        type=int,
+        metavar="FRAMES",
+        help="Measure 1..N core scaling on a synthetic capture",
+    )
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        result = decode_captures(
+            args.captures, args.output, args.dbc, workers=args.workers
+        )
+        print(json.dumps(result, indent=2))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        capture = os.path.join(tmp, "capture.log")
+        frame_ids = [
+            m.get_message_id(15, MessageType.HEARTBEAT)
+            for m in get_active_modules()
+        ]
+        with open(capture, "w", encoding="ascii") as f:
+            for i in range(args.benchmark):
+                timestamp = 1_700_000_000 + i / 1000
+                payload = (1_700_000_000 + i // 1000).to_bytes(4, "little")
+                frame_id = frame_ids[i % len(frame_ids)]
+                f.write(
+                    f"({timestamp:.6f}) vcan0 "
+                    f"{frame_id:08X}#{payload.hex().upper()}\n"
+                )
+
+        size = os.path.getsize(capture)
+        max_workers = args.workers or os.cpu_count() or 1
+        print("\n--- Capture Pipeline Scaling ---")
+        print(f"Capture: {args.benchmark} frames, {size / 1e6:.1f} MB")
+        baseline = None
+        for workers in range(1, max_workers + 1):
+            output = os.path.join(tmp, f"out{workers}")
+            t0 = time.perf_counter()
+            decode_captures(
+                [capture],
+                output,
+                args.dbc,
+                workers=workers,
+                chunk_size=max(size // (4 * max_workers), 1),
+            )
+            elapsed = time.perf_counter() - t0
+            baseline = baseline or elapsed
+            print(
+                f"{workers:3d} workers: {elapsed:6.2f} s,"
+                f" {args.benchmark / elapsed:>10,.0f} frames/s,"
+                f" speedup {baseline / elapsed:.2f}x"
+            )
+        print("--------------------------------\n")
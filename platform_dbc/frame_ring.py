@@ -0,0 +1,326 @@
+"""
+Shared-Memory Frame Ring
+
+A single receiver process decodes CAN frames once with the platform database
+and publishes fixed-size records into a `multiprocessing.shared_memory` ring
+buffer. Any number of consumer processes attach to the ring by name and read
+records straight out of the shared block at their own pace.
+
+Ring layout (little-endian):
+
+    header:  4s magic, u32 version, u32 capacity, u32 max signals,
+             u64 head (sequence number of the next record to be written)
+    slot:    u64 sequence + 1 (0 while the slot is being written),
+             f64 timestamp, u32 frame ID, u32 value count,
+             f64 value * max signals
+
+Values are stored in the signal order of the message definition. A consumer
+that falls more than `capacity` records behind skips ahead to the oldest
+record still in the ring and counts the records it missed in `lost`.
+"""
+
+import logging
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Union
+
+import can
+import cantools
+
+from platform_dbc.live_database import LiveDatabase
+
+RING_MAGIC = b"WSRB"
+RING_VERSION = 1
+DEFAULT_CAPACITY = 4096
+DEFAULT_MAX_SIGNALS = 8
+DECODE_ERROR_LOG_INTERVAL = 10.0  # seconds between decode error warnings
+
+log = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<4sIIIQ")
+_HEAD_OFFSET = 16
+_HEAD = struct.Struct("<Q")
+_SLOT_SEQ = struct.Struct("<Q")
+_SLOT_INFO = struct.Struct("<dII")
+
+
+@dataclass(frozen=True)
+class DecodedRecord:
+    """A decoded frame as stored in the ring."""
+
+    sequence: int
+    timestamp: float
+    frame_id: int
+    values: tuple[float, ...]
+
+
+class FrameRing:
+    """Fixed-size decoded frame records in a named shared memory block."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        self.buf = shm.buf
+        magic, version, capacity, max_signals, _ = _HEADER.unpack_from(
+            self.buf
+        )
+        if magic != RING_MAGIC or version != RING_VERSION:
+            raise ValueError(f"Shared memory {shm.name!r} is not a frame ring")
+        self.capacity = capacity
+        self.max_signals = max_signals
+        self._values = struct.Struct(f"<{max_signals}d")
+        self.slot_size = _SLOT_SEQ.size + _SLOT_INFO.size + self._values.size
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @classmethod
+    def create(
+        cls,
+        name: Optional[str] = None,
+        capacity: int = DEFAULT_CAPACITY,
+        max_signals: int = DEFAULT_MAX_SIGNALS,
+    ) -> "FrameRing":
+        """Create a new ring. The creating process owns and unlinks it."""
+        slot_size = _SLOT_SEQ.size + _SLOT_INFO.size + 8 * max_signals
+        shm = shared_memory.SharedMemory(
+            name=name, create=True, size=_HEADER.size + capacity * slot_size
+        )
+        shm.buf[: shm.size] = bytes(shm.size)
+        _HEADER.pack_into(
+            shm.buf, 0, RING_MAGIC, RING_VERSION, capacity, max_signals, 0
+        )
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "FrameRing":
+        """Attach to a ring created by another process."""
+        shm = shared_memory.SharedMemory(name=name)
+        # Only the creator may unlink the block; stop the resource tracker
+        # of this process from doing so when it exits.
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    @property
+    def head(self) -> int:
+        """Sequence number of the next record to be published."""
+        return _HEAD.unpack_from(self.buf, _HEAD_OFFSET)[0]
+
+    def _slot_offset(self, sequence: int) -> int:
+        return _HEADER.size + (sequence % self.capacity) * self.slot_size
+
+    def publish(
+        self, timestamp: float, frame_id: int, values: tuple[float, ...]
+    ) -> int:
+        """
+        Write one record. Only a single process may publish to a ring.
+
+        Returns:
+            The sequence number of the record.
+        """
+        if len(values) > self.max_signals:
+            raise ValueError(
+                f"Frame 0x{frame_id:X} has {len(values)} signals, the ring"
+                f" holds at most {self.max_signals}"
+            )
+        sequence = self.head
+        offset = self._slot_offset(sequence)
+        padded = tuple(values) + (0.0,) * (self.max_signals - len(values))
+
+        # Mark the slot as busy so readers can tell a torn record
+        _SLOT_SEQ.pack_into(self.buf, offset, 0)
+        _SLOT_INFO.pack_into(
+            self.buf, offset + 8, timestamp, frame_id, len(values)
+        )
+        self._values.pack_into(self.buf, offset + 8 + _SLOT_INFO.size, *padded)
+        _SLOT_SEQ.pack_into(self.buf, offset, sequence + 1)
+        _HEAD.pack_into(self.buf, _HEAD_OFFSET, sequence + 1)
+        return sequence
+
+    def read_slot(self, sequence: int) -> Optional[DecodedRecord]:
+        """
+        Read a record in place. Returns None if the slot no longer (or not
+        yet) holds that sequence number.
+        """
+        offset = self._slot_offset(sequence)
+        if _SLOT_SEQ.unpack_from(self.buf, offset)[0] != sequence + 1:
+            return None
+        timestamp, frame_id, count = _SLOT_INFO.unpack_from(
+            self.buf, offset + 8
+        )
+        values = self._values.unpack_from(
+            self.buf, offset + 8 + _SLOT_INFO.size
+        )[:count]
+        if _SLOT_SEQ.unpack_from(self.buf, offset)[0] != sequence + 1:
+            return None  # overwritten while we were reading it
+        return DecodedRecord(sequence, timestamp, frame_id, values)
+
+    def close(self) -> None:
+        """Detach from the ring, removing it if this process created it."""
+        self.buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+class RingReader:
+    """An independent cursor over a FrameRing."""
+
+    def __init__(self, ring: FrameRing, from_start: bool = False):
+        """
+        Args:
+            ring: The ring to read.
+            from_start: Start at the oldest record still in the ring instead
+                        of only reading records published from now on.
+        """
+        self.ring = ring
+        self.next_sequence = (
+            max(ring.head - ring.capacity, 0) if from_start else ring.head
+        )
+        self.lost = 0
+
+    def read(self) -> Optional[DecodedRecord]:
+        """Return the next record, or None if the reader is caught up."""
+        ring = self.ring
+        while True:
+            head = ring.head
+            if self.next_sequence >= head:
+                return None
+            oldest = head - ring.capacity
+            if self.next_sequence < oldest:
+                # The writer lapped us, skip to what is still available
+                self.lost += oldest - self.next_sequence
+                self.next_sequence = oldest
+
+            record = ring.read_slot(self.next_sequence)
+            if record is not None:
+                self.next_sequence += 1
+                return record
+            # The writer is overwriting this slot right now
+            self.lost += 1
+            self.next_sequence += 1
+
+    def read_batch(self, max_records: int = 256) -> list[DecodedRecord]:
+        """Read up to `max_records` available records."""
+        records = []
+        while len(records) < max_records:
+            record = self.read()
+            if record is None:
+                break
+            records.append(record)
+        return records
+
+
+def receive_frames(
+    bus: can.BusABC,
+    db: Union[cantools.database.Database, LiveDatabase],
+    ring: FrameRing,
+    stop_event: threading.Event,
+    timeout: float = 0.5,
+) -> int:
+    """
+    Decode frames from `bus` and publish them to `ring` until stopped.
+
+    Frames that are not in the database are dropped. So are frames that
+    fail to decode or do not fit a ring slot (more than `max_signals`
+    values, or multiplexed signals absent from the frame); these count as
+    decode errors and are logged at most once per
+    `DECODE_ERROR_LOG_INTERVAL`.
+
+    Returns:
+        Number of frames dropped as decode errors.
+    """
+    decode_errors = 0
+    next_report = 0.0
+    while not stop_event.is_set():
+        msg = bus.recv(timeout)
+        if msg is None or msg.is_error_frame or msg.is_remote_frame:
+            continue
+
+        frame_id = msg.arbitration_id
+        try:
+            # Looked up per frame so a LiveDatabase reload applies at once
+            message = db.get_message_by_frame_id(frame_id)
+        except KeyError:
+            continue
+
+        try:
+            decoded = message.decode(bytes(msg.data), decode_choices=False)
+            ring.publish(
+                msg.timestamp,
+                frame_id,
+                tuple(decoded[signal.name] for signal in message.signals),
+            )
+        except Exception as e:
+            decode_errors += 1
+            now = time.monotonic()
+            if now >= next_report:
+                log.warning(
+                    f"Error decoding message {message.name}: {e}"
+                    f" ({decode_errors} decode errors so far)"
+                )
+                next_report = now + DECODE_ERROR_LOG_INTERVAL
+    return decode_errors
+
+
+def run_receiver(
+    ring_name: str,
+    dbc_path: str = "wust-sat.dbc",
+    channel: str = "vcan0",
+    interface: str = "socketcan",
+    stop_event: Optional[threading.Event] = None,
+) -> None:
+    """
+    Entry point for the receiver process: one bus socket, one decode.
+    The DBC file is watched and reloaded without restarting the receiver.
+    """
+    db = LiveDatabase(dbc_path)
+    ring = FrameRing.attach(ring_name)
+    stop_event = stop_event or threading.Event()
+    try:
+        with db, can.Bus(interface=interface, channel=channel) as bus:
+            receive_frames(bus, db, ring, stop_event)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing
+
+    parser = argparse.ArgumentParser(
+        description="Decode a CAN channel once and fan it out to consumers"
+    )
+    parser.add_argument("--channel", default="vcan0")
+    parser.add_argument("--dbc", default="wust-sat.dbc")
+    parser.add_argument("--name", default="wust-sat-frames")
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY)
+    args = parser.parse_args()
+
+    ring = FrameRing.create(args.name, capacity=args.capacity)
+    receiver = multiprocessing.Process(
+        target=run_receiver,
+        args=(args.name, args.dbc, args.channel),
+        daemon=True,
+    )
+    receiver.start()
+    print(f"Publishing decoded frames from {args.channel} to {ring.name!r}")
+
+    # Example consumer; real consumers attach with FrameRing.attach(name)
+    reader = RingReader(ring)
+    try:
+        while receiver.is_alive():
+            for record in reader.read_batch():
+                print(record)
+            time.sleep(0.05)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.terminate()
+        ring.close()
@@ -0,0 +1,295 @@
+"""
+Hot-Reloadable CAN Database
+
+`LiveDatabase` is a database handle for long-running decoders and
+simulators. It watches either a DBC file or the generator inputs (the
+`modules`, `message_types` and `messages` sources) and, when they change,
+loads the new definitions in a background thread and swaps them in with a
+single reference assignment, so frame processing never waits for a reload.
+
+Messages whose definition did not change keep their existing cantools
+`Message` object (and compiled codec); only added or changed messages are
+replaced.
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import cantools
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+log = logging.getLogger(__name__)
+
+# Generation runs in a fresh interpreter so edited modules are imported from
+# scratch instead of being reloaded into this process.
+_GENERATE_SCRIPT = (
+    "import sys\n"
+    "from platform_dbc.can_database import create_can_database\n"
+    "db = create_can_database(include_inactive=sys.argv[1] == '1')\n"
+    "sys.stdout.write(db.as_dbc_string())\n"
+)
+
+
+@dataclass(frozen=True)
+class ReloadResult:
+    """Message names affected by a reload."""
+
+    added: set[str] = field(default_factory=set)
+    changed: set[str] = field(default_factory=set)
+    removed: set[str] = field(default_factory=set)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    generation: int
+    version: Optional[str]
+    by_frame_id: dict[int, cantools.database.can.Message]
+    by_name: dict[str, cantools.database.can.Message]
+
+
+def _signal_fingerprint(signal: cantools.database.can.Signal) -> tuple:
+    choices = (
+        tuple((k, str(v)) for k, v in sorted(signal.choices.items()))
+        if signal.choices
+        else None
+    )
+    return (
+        signal.name,
+        signal.start,
+        signal.length,
+        signal.byte_order,
+        signal.is_signed,
+        signal.is_float,
+        signal.scale,
+        signal.offset,
+        signal.minimum,
+        signal.maximum,
+        choices,
+        signal.is_multiplexer,
+        signal.multiplexer_ids and tuple(signal.multiplexer_ids),
+        signal.multiplexer_signal,
+    )
+
+
+def _message_fingerprint(message: cantools.database.can.Message) -> tuple:
+    """Everything that affects how a message is encoded or decoded."""
+    return (
+        message.name,
+        message.frame_id,
+        message.is_extended_frame,
+        message.is_fd,
+        message.length,
+        tuple(_signal_fingerprint(s) for s in message.signals),
+    )
+
+
+def generator_input_paths() -> list[str]:
+    """Source files the generated database depends on."""
+    paths = [
+        os.path.join(_PACKAGE_DIR, name)
+        for name in ("can_database.py", "message_types.py", "modules.py")
+    ]
+    messages_dir = os.path.join(_PACKAGE_DIR, "messages")
+    paths += sorted(
+        os.path.join(messages_dir, name)
+        for name in os.listdir(messages_dir)
+        if name.endswith(".py")
+    )
+    return paths
+
+
+def generate_dbc_string(include_inactive: bool = False) -> str:
+    """Run the database generator in a subprocess and return the DBC text."""
+    result = subprocess.run(  # noqa: S603
+        [
+            sys.executable,
+            "-c",
+            _GENERATE_SCRIPT,
+            "1" if include_inactive else "0",
+        ],
+        cwd=os.path.dirname(_PACKAGE_DIR),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout
+
+
+class LiveDatabase:
+    """
+    A CAN database that can be reloaded while frames are being decoded.
+
+    Lookups read the current snapshot once, so a decode always sees either
+    the old or the new definitions, never a mix of both.
+    """
+
+    def __init__(
+        self,
+        dbc_path: Optional[str] = None,
+        include_inactive: bool = False,
+        poll_interval: float = 1.0,
+    ):
+        """
+        Args:
+            dbc_path: DBC file to load and watch. If None, the database is
+                      generated from `platform_dbc.modules` and `messages`
+                      and those sources are watched instead.
+            include_inactive: Include inactive modules when generating.
+            poll_interval: Seconds between checks for changed inputs.
+        """
+        self.dbc_path = dbc_path
+        self.include_inactive = include_inactive
+        self.poll_interval = poll_interval
+        self._listeners: list[Callable[[ReloadResult], None]] = []
+        self._reload_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._snapshot = _Snapshot(0, None, {}, {})
+        self._mtimes = self._input_mtimes()
+        self.reload()
+
+    @property
+    def generation(self) -> int:
+        """Incremented every time a reload changes the database."""
+        return self._snapshot.generation
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._snapshot.version
+
+    @property
+    def messages(self) -> list[cantools.database.can.Message]:
+        return list(self._snapshot.by_frame_id.values())
+
+    def get_message_by_frame_id(
+        self, frame_id: int
+    ) -> cantools.database.can.Message:
+        """Find a message by frame ID. Raises KeyError if it is unknown."""
+        return self._snapshot.by_frame_id[frame_id]
+
+    def get_message_by_name(self, name: str) -> cantools.database.can.Message:
+        """Find a message by name. Raises KeyError if it is unknown."""
+        return self._snapshot.by_name[name]
+
+    def decode_message(self, frame_id: int, data: bytes) -> dict:
+        """Decode a frame payload, raising KeyError for unknown frame IDs."""
+        message = self._snapshot.by_frame_id[frame_id]
+        return message.decode(data, decode_choices=False)
+
+    def add_listener(self, callback: Callable[[ReloadResult], None]) -> None:
+        """Call `callback(result)` after every reload that changed something."""
+        self._listeners.append(callback)
+
+    def _input_paths(self) -> list[str]:
+        if self.dbc_path is not None:
+            return [self.dbc_path]
+        return generator_input_paths()
+
+    def _input_mtimes(self) -> dict[str, int]:
+        mtimes = {}
+        for path in self._input_paths():
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                pass  # e.g. the DBC file is being replaced
+        return mtimes
+
+    def _load(self) -> cantools.database.Database:
+        if self.dbc_path is not None:
+            return cantools.database.load_file(self.dbc_path)
+        return cantools.database.load_string(
+            generate_dbc_string(self.include_inactive)
+        )
+
+    def reload(self) -> ReloadResult:
+        """
+        Load the current definitions and swap in the ones that changed.
+
+        Raises whatever loading the DBC file or running the generator
+        raises; the current database stays in use in that case.
+        """
+        with self._reload_lock:
+            new_db = self._load()
+            old = self._snapshot
+            result = ReloadResult()
+            by_frame_id = {}
+
+            for message in new_db.messages:
+                previous = old.by_frame_id.get(message.frame_id)
+                if previous is None:
+                    result.added.add(message.name)
+                elif _message_fingerprint(previous) != _message_fingerprint(
+                    message
+                ):
+                    result.changed.add(message.name)
+                else:
+                    message = previous
+                by_frame_id[message.frame_id] = message
+            result.removed.update(
+                m.name
+                for frame_id, m in old.by_frame_id.items()
+                if frame_id not in by_frame_id
+            )
+
+            if not result and new_db.version == old.version:
+                return result
+
+            self._snapshot = _Snapshot(
+                generation=old.generation + 1,
+                version=new_db.version,
+                by_frame_id=by_frame_id,
+                by_name={m.name: m for m in by_frame_id.values()},
+            )
+
+        for listener in self._listeners:
+            listener(result)
+        return result
+
+    def check_for_changes(self) -> Optional[ReloadResult]:
+        """Reload if any watched input changed since the last check."""
+        mtimes = self._input_mtimes()
+        if mtimes == self._mtimes:
+            return None
+        self._mtimes = mtimes
+        try:
+            return self.reload()
+        except Exception as e:
+            # Keep decoding with the old definitions, e.g. on a half-written
+            # DBC file; the next write triggers another attempt.
+            log.warning(f"Error reloading CAN database: {e}", exc_info=True)
+            return None
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(self.poll_interval):
+            self.check_for_changes()
+
+    def start(self) -> None:
+        """Start watching the inputs in a background thread."""
+        if self._watcher is not None:
+            return
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch, daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        """Stop the background watcher."""
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def __enter__(self) -> "LiveDatabase":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
@@ -1,3 +1,5 @@
 """
 Package containing definitions for specific CAN messages.
 """
+
+from platform_dbc.messages import heartbeat  # noqa: F401
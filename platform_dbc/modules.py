@@ -56,6 +56,30 @@ class Module:
         return can_id
 
 
+def parse_message_id(can_id: int) -> tuple[int, int, MessageType]:
+    """
+    Split a 29-bit CAN ID into its source ID, destination ID and message type.
+
+    This is the inverse of `Module.get_message_id`.
+    """
+    if not (0 <= can_id <= 0xFFFF):
+        raise ValueError(
+            f"CAN ID 0x{can_id:X} uses reserved or ground station bits"
+        )
+
+    source_id = can_id & 0x0F
+    destination_id = (can_id >> 4) & 0x0F
+    try:
+        message_type = MessageType((can_id >> 8) & 0xFF)
+    except ValueError:
+        raise ValueError(
+            f"CAN ID 0x{can_id:X} has unknown message type"
+            f" 0x{(can_id >> 8) & 0xFF:02X}"
+        ) from None
+
+    return source_id, destination_id, message_type
+
+
 # Define all modules
 MODULES: list[Module] = [
     Module(
@@ -0,0 +1,285 @@
+"""
+Compact Telemetry Batching
+
+This module packs decoded CAN messages into compact binary batches for the
+LoRa downlink and unpacks them again on the ground.
+
+Batch layout (all integers are LEB128 varints unless noted):
+
+    u8       format version
+    varint   base time in milliseconds
+    varint   number of message keys
+    per key: u8 (source ID << 4 | destination ID), u8 MessageType value
+    varint   number of records
+    per record:
+        zigzag  time delta [ms] from the previous record (or base time)
+        varint  message key index
+        zigzag  raw value delta from the previous record with the same key,
+                one per signal in message definition order
+
+Message IDs are never sent in full: each distinct ID is listed once per batch
+as two bytes taken from the `Module` / `MessageType` tables, and records
+refer to it by index. Slowly changing signals such as the heartbeat
+`unix_timestamp` shrink to a single byte per record.
+"""
+
+import struct
+from dataclasses import dataclass
+from typing import Iterable
+
+import cantools
+
+from platform_dbc.message_types import MessageType
+from platform_dbc.modules import get_module_by_id, parse_message_id
+
+BATCH_FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class TelemetryRecord:
+    """A decoded CAN message together with its reception time."""
+
+    timestamp: float  # seconds
+    frame_id: int
+    signals: dict[str, float]
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    """Append an unsigned LEB128 varint to `out`."""
+    if value < 0:
+        raise ValueError(f"Varint value {value} must not be negative")
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    """Read an unsigned LEB128 varint, returning (value, new position)."""
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Truncated telemetry batch")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _zigzag(value: int) -> int:
+    """Map a signed integer onto an unsigned one (0, -1, 1, -2, ...)."""
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def _signal_to_raw(signal: cantools.database.can.Signal, value: float) -> int:
+    """Convert a physical signal value to the integer sent in the batch."""
+    raw = signal.conversion.numeric_scaled_to_raw(value)
+    if signal.is_float:
+        # The raw float's IEEE bits, so raw_to_signal can undo scale/offset
+        fmt, int_fmt = ("<f", "<I") if signal.length == 32 else ("<d", "<Q")
+        return struct.unpack(int_fmt, struct.pack(fmt, raw))[0]
+    return round(raw)
+
+
+def _raw_to_signal(signal: cantools.database.can.Signal, raw: int) -> float:
+    """Convert an integer from the batch back to a physical signal value."""
+    if signal.is_float:
+        fmt, int_fmt = ("<f", "<I") if signal.length == 32 else ("<d", "<Q")
+        raw = struct.unpack(fmt, struct.pack(int_fmt, raw))[0]
+    return signal.conversion.raw_to_scaled(raw, decode_choices=False)
+
+
+def _message_key(frame_id: int) -> bytes:
+    """Express a frame ID as (source << 4 | destination, message type)."""
+    source_id, destination_id, message_type = parse_message_id(frame_id)
+    if get_module_by_id(source_id) is None:
+        raise ValueError(
+            f"Frame ID 0x{frame_id:X} has unknown source module {source_id}"
+        )
+    return bytes((source_id << 4 | destination_id, message_type.value))
+
+
+def _frame_id_from_key(key: bytes) -> int:
+    """Rebuild the CAN frame ID from a two byte message key."""
+    source_id, destination_id = key[0] >> 4, key[0] & 0x0F
+    module = get_module_by_id(source_id)
+    if module is None:
+        raise ValueError(f"Unknown source module {source_id} in batch")
+    return module.get_message_id(destination_id, MessageType(key[1]))
+
+
+def encode_batch(
+    db: cantools.database.Database, records: Iterable[TelemetryRecord]
+) -> bytes:
+    """
+    Pack decoded telemetry records into a single compact batch.
+
+    Args:
+        db: The cantools Database the records were decoded with.
+        records: Records to pack. Timestamps are stored with millisecond
+                 resolution and need not be sorted.
+
+    Returns:
+        The encoded batch.
+    """
+    records = list(records)
+    keys: dict[int, int] = {}
+    key_bytes = bytearray()
+    body = bytearray()
+
+    base_ms = round(records[0].timestamp * 1000) if records else 0
+    previous_ms = base_ms
+    previous_raw: dict[int, list[int]] = {}
+
+    for record in records:
+        message = db.get_message_by_frame_id(record.frame_id)
+        key_index = keys.get(record.frame_id)
+        if key_index is None:
+            key_index = keys[record.frame_id] = len(keys)
+            key_bytes += _message_key(record.frame_id)
+            previous_raw[record.frame_id] = [0] * len(message.signals)
+
+        timestamp_ms = round(record.timestamp * 1000)
+        _write_varint(body, _zigzag(timestamp_ms - previous_ms))
+        previous_ms = timestamp_ms
+        _write_varint(body, key_index)
+
+        last = previous_raw[record.frame_id]
+        for i, signal in enumerate(message.signals):
+            raw = _signal_to_raw(signal, record.signals[signal.name])
+            _write_varint(body, _zigzag(raw - last[i]))
+            last[i] = raw
+
+    out = bytearray((BATCH_FORMAT_VERSION,))
+    _write_varint(out, base_ms)
+    _write_varint(out, len(keys))
+    out += key_bytes
+    _write_varint(out, len(records))
+    out += body
+    return bytes(out)
+
+
+def decode_batch(
+    db: cantools.database.Database, data: bytes
+) -> list[TelemetryRecord]:
+    """
+    Unpack a batch produced by `encode_batch`.
+
+    Args:
+        db: The cantools Database used on the encoding side.
+        data: The encoded batch.
+
+    Returns:
+        The records in the order they were encoded.
+    """
+    if not data or data[0] != BATCH_FORMAT_VERSION:
+        raise ValueError("Unsupported telemetry batch format")
+
+    base_ms, pos = _read_varint(data, 1)
+    key_count, pos = _read_varint(data, pos)
+    if pos + 2 * key_count > len(data):
+        raise ValueError("Truncated telemetry batch")
+
+    frame_ids = []
+    for i in range(key_count):
+        key = data[pos + 2 * i : pos + 2 * i + 2]
+        frame_ids.append(_frame_id_from_key(key))
+    pos += 2 * key_count
+    messages = [db.get_message_by_frame_id(fid) for fid in frame_ids]
+    previous_raw = [[0] * len(message.signals) for message in messages]
+
+    record_count, pos = _read_varint(data, pos)
+    records = []
+    timestamp_ms = base_ms
+    for _ in range(record_count):
+        delta, pos = _read_varint(data, pos)
+        timestamp_ms += _unzigzag(delta)
+        key_index, pos = _read_varint(data, pos)
+        if key_index >= key_count:
+            raise ValueError(f"Message key index {key_index} out of range")
+
+        message = messages[key_index]
+        last = previous_raw[key_index]
+        signals = {}
+        for i, signal in enumerate(message.signals):
+            delta, pos = _read_varint(data, pos)
+            last[i] += _unzigzag(delta)
+            signals[signal.name] = _raw_to_signal(signal, last[i])
+
+        records.append(
+            TelemetryRecord(
+                timestamp=timestamp_ms / 1000,
+                frame_id=frame_ids[key_index],
+                signals=signals,
+            )
+        )
+
+    return records
+
+
+def raw_frame_size(db: cantools.database.Database, frame_id: int) -> int:
+    """
+    Size of a frame forwarded on its own: 4 byte ID, 1 byte length,
+    payload and a 4 byte Unix timestamp.
+    """
+    return 4 + 1 + db.get_message_by_frame_id(frame_id).length + 4
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from platform_dbc.can_database import create_can_database
+    from platform_dbc.modules import MODULES
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark telemetry batching on synthetic traffic"
+    )
+    parser.add_argument("--seconds", type=int, default=3600)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    db = create_can_database(include_inactive=True)
+    db.refresh()
+
+    # Every module sends a heartbeat once per second with a little jitter
+    start = int(time.time())
+    traffic = [
+        TelemetryRecord(
+            timestamp=((start + second) * 1000 + module.id * 3) / 1000,
+            frame_id=module.get_message_id(15, MessageType.HEARTBEAT),
+            signals={"unix_timestamp": start + second},
+        )
+        for second in range(args.seconds)
+        for module in MODULES
+    ]
+    batches = [
+        traffic[i : i + args.batch_size]
+        for i in range(0, len(traffic), args.batch_size)
+    ]
+
+    t0 = time.perf_counter()
+    encoded = [encode_batch(db, batch) for batch in batches]
+    t1 = time.perf_counter()
+    decoded = [decode_batch(db, data) for data in encoded]
+    t2 = time.perf_counter()
+
+    assert sum(decoded, []) == traffic  # noqa: S101
+
+    raw_size = sum(raw_frame_size(db, r.frame_id) for r in traffic)
+    batched_size = sum(len(data) for data in encoded)
+    print("\n--- Telemetry Batching Benchmark ---")
+    print(f"Records: {len(traffic)} in {len(batches)} batches")
+    print(f"Raw frames: {raw_size} bytes")
+    print(f"Batched: {batched_size} bytes")
+    print(f"Compression ratio: {raw_size / batched_size:.2f}x")
+    print(f"Encode: {len(traffic) / (t1 - t0):,.0f} records/s")
+    print(f"Decode: {len(traffic) / (t2 - t1):,.0f} records/s")
+    print("------------------------------------\n")
@@ -0,0 +1,97 @@
+import asyncio
+
+import canopen
+import pytest
+from canopen.sdo.exceptions import SdoAbortedError, SdoCommunicationError
+
+from platform_canopen.async_master import AsyncSdoMaster, run_in_virtual_time
+from platform_canopen.lora_node import LORA_NODE_ID, LoraNode
+from platform_canopen.obc_node import OBC_NODE_ID, ObcNode
+from platform_canopen.virtual_time import VirtualCanBus
+
+
+@pytest.fixture
+def bus():
+    bus = VirtualCanBus(latency=0.001)
+    nodes = [LoraNode(virtual_bus=bus), ObcNode(virtual_bus=bus)]
+    for node in nodes:
+        node.start()
+    bus.lora = nodes[0]
+    yield bus
+    for node in nodes:
+        node.stop()
+
+
+@pytest.fixture
+def network(bus):
+    network = canopen.Network()
+    bus.connect(network)
+    yield network
+    network.disconnect()
+
+
+def test_concurrent_upload_and_pipelined_download(bus, network):
+    async def scenario():
+        master = AsyncSdoMaster(network)
+        # Queued for the same node, so the upload sees the written value
+        write = asyncio.ensure_future(
+            master.download(LORA_NODE_ID, 0x2000, 0, b"\x2a")
+        )
+        results = await master.upload_many(
+            [(LORA_NODE_ID, 0x2000, 0), (OBC_NODE_ID, 0x2000, 0)]
+        )
+        await write
+        await master.close()
+        return results
+
+    results = run_in_virtual_time(bus.scheduler, scenario())
+
+    assert results == [b"\x2a", b"\x01"]
+    assert bus.lora.control_value == 42
+
+
+def test_abort_is_raised(bus, network):
+    async def scenario():
+        master = AsyncSdoMaster(network)
+        try:
+            return await master.upload_many([(OBC_NODE_ID, 0x2FFF, 0)])
+        finally:
+            await master.close()
+
+    (result,) = run_in_virtual_time(bus.scheduler, scenario())
+
+    assert isinstance(result, SdoAbortedError)
+    assert result.code == 0x06020000
+
+
+def test_missing_node_times_out_after_retries(bus, network):
+    sent = []
+    bus.add_listener(lambda msg: sent.append(msg.arbitration_id))
+
+    async def scenario():
+        master = AsyncSdoMaster(network, timeout=0.02, retries=1)
+        try:
+            await master.upload(5, 0x2000)
+        finally:
+            await master.close()
+
+    started = bus.scheduler.time()
+    with pytest.raises(SdoCommunicationError):
+        run_in_virtual_time(bus.scheduler, scenario())
+    # Two timeouts of virtual time, however fast the scheduler ran
+    assert bus.scheduler.time() - started == pytest.approx(0.04, abs=0.005)
+    bus.scheduler.run(until=bus.scheduler.time() + 0.01)
+    # Two requests, each followed by an abort
+    assert sent.count(0x605) == 4
+
+
+def test_empty_download_is_rejected(bus, network):
+    async def scenario():
+        master = AsyncSdoMaster(network)
+        try:
+            await master.download(LORA_NODE_ID, 0x2000, 0, b"")
+        finally:
+            await master.close()
+
+    with pytest.raises(ValueError):
+        run_in_virtual_time(bus.scheduler, scenario())
@@ -0,0 +1,210 @@
+import threading
+import time
+
+import canopen
+
+from platform_canopen.callback_dispatch import (
+    CallbackDispatcher,
+    QueueFullPolicy,
+)
+from platform_canopen.lora_node import LORA_NODE_ID, LoraNode
+from platform_canopen.virtual_time import VirtualCanBus
+
+
+def test_same_object_keeps_order():
+    dispatcher = CallbackDispatcher(workers=4, policy=QueueFullPolicy.BLOCK)
+    dispatcher.start()
+    seen = {key: [] for key in range(8)}
+    for value in range(50):
+        for key in seen:
+            dispatcher.submit((0x2000 + key, 0), seen[key].append, value)
+    dispatcher.stop()
+
+    assert all(values == list(range(50)) for values in seen.values())
+    metrics = dispatcher.metrics()
+    assert metrics.submitted == metrics.completed == 400
+    assert metrics.queue_depth == 0
+
+
+def test_slow_callback_does_not_block_submit():
+    dispatcher = CallbackDispatcher(workers=1)
+    dispatcher.start()
+    release = threading.Event()
+
+    started = time.monotonic()
+    dispatcher.submit((0x2000, 0), release.wait)
+    dispatcher.submit((0x2001, 0), lambda: None)
+    elapsed = time.monotonic() - started
+    release.set()
+    dispatcher.stop()
+
+    assert elapsed < 0.5
+    assert dispatcher.metrics().max_wait > 0
+
+
+def _fill(policy):
+    dispatcher = CallbackDispatcher(workers=1, max_queue=2, policy=policy)
+    dispatcher.start()
+    release = threading.Event()
+    running = threading.Event()
+    ran = []
+
+    def block():
+        running.set()
+        release.wait()
+
+    dispatcher.submit((0x2000, 0), block)
+    running.wait()
+    accepted = [
+        dispatcher.submit((0x2000, 0), ran.append, i) for i in range(4)
+    ]
+    release.set()
+    dispatcher.stop()
+    return accepted, ran, dispatcher.metrics()
+
+
+def test_drop_newest_policy():
+    accepted, ran, metrics = _fill(QueueFullPolicy.DROP_NEWEST)
+
+    assert accepted == [True, True, False, False]
+    assert ran == [0, 1]
+    assert metrics.dropped == 2
+    assert metrics.max_queue_depth == 2
+
+
+def test_drop_oldest_policy():
+    accepted, ran, metrics = _fill(QueueFullPolicy.DROP_OLDEST)
+
+    assert accepted == [True] * 4
+    assert ran == [2, 3]
+    assert metrics.dropped == 2
+
+
+def test_drop_oldest_logs_evicted_key(caplog):
+    dispatcher = CallbackDispatcher(
+        workers=1, max_queue=1, policy=QueueFullPolicy.DROP_OLDEST
+    )
+    dispatcher.start()
+    release = threading.Event()
+    running = threading.Event()
+
+    def block():
+        running.set()
+        release.wait()
+
+    dispatcher.submit((0x2000, 0), block)
+    running.wait()
+    dispatcher.submit((0x2001, 1), lambda: None)
+    dispatcher.submit((0x2002, 2), lambda: None)
+    release.set()
+    dispatcher.stop()
+
+    (record,) = caplog.records
+    assert "0x2001:01" in record.getMessage()
+    assert dispatcher.metrics().queue_depth == 0
+
+
+def test_default_policy_blocks():
+    assert CallbackDispatcher().policy is QueueFullPolicy.BLOCK
+
+
+def test_block_policy_waits_for_space():
+    dispatcher = CallbackDispatcher(
+        workers=1, max_queue=1, policy=QueueFullPolicy.BLOCK
+    )
+    dispatcher.start()
+    ran = []
+    for i in range(20):
+        dispatcher.submit((0x2000, 0), ran.append, i)
+    dispatcher.stop()
+
+    assert ran == list(range(20))
+    assert dispatcher.metrics().dropped == 0
+
+
+def test_blocked_submit_is_dropped_on_stop():
+    dispatcher = CallbackDispatcher(
+        workers=1, max_queue=1, policy=QueueFullPolicy.BLOCK
+    )
+    dispatcher.start()
+    release = threading.Event()
+    running = threading.Event()
+
+    def block():
+        running.set()
+        release.wait()
+
+    dispatcher.submit((0x2000, 0), block)
+    running.wait()
+    dispatcher.submit((0x2000, 0), lambda: None)
+    results = []
+    submitter = threading.Thread(
+        target=lambda: results.append(
+            dispatcher.submit((0x2000, 0), lambda: None)
+        )
+    )
+    submitter.start()
+    stopper = threading.Thread(target=dispatcher.stop)
+    stopper.start()
+    submitter.join(timeout=2)
+    release.set()
+    stopper.join()
+
+    assert results == [False]
+    metrics = dispatcher.metrics()
+    assert metrics.dropped == 1
+    assert metrics.completed == 2
+    assert metrics.queue_depth == 0
+
+
+def test_errors_are_counted():
+    dispatcher = CallbackDispatcher(workers=0)
+    dispatcher.start()
+    dispatcher.submit((0x2000, 0), lambda: 1 / 0)
+
+    assert dispatcher.metrics().errors == 1
+
+
+def test_node_write_callbacks_are_dispatched():
+    bus = VirtualCanBus()
+    lora = LoraNode(virtual_bus=bus)
+    lora.start()
+    master = canopen.Network()
+    bus.connect(master)
+
+    master.send_message(
+        0x600 + LORA_NODE_ID, bytes([0x2F, 0x00, 0x20, 0x00, 0x09, 0, 0, 0])
+    )
+    lora.run(duration=1.0)
+    master.disconnect()
+
+    assert lora.control_value == 9
+    assert lora.callback_metrics().completed == 1
+
+
+def test_node_runs_write_callbacks_on_workers():
+    lora = LoraNode(channel="dispatch-test", interface="virtual")
+    threads = []
+    # Registered before start(), must survive it
+    lora.add_write_callback(
+        lambda **kwargs: threads.append(threading.current_thread().name)
+    )
+    lora.start()
+    master = canopen.Network()
+    master.connect(interface="virtual", channel="dispatch-test")
+    try:
+        master.send_message(
+            0x600 + LORA_NODE_ID,
+            bytes([0x2F, 0x00, 0x20, 0x00, 0x07, 0, 0, 0]),
+        )
+        deadline = time.monotonic() + 5
+        while lora.control_value != 7 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        master.disconnect()
+        lora.stop()
+
+    assert lora.control_value == 7
+    assert len(threads) == 1
+    assert threads[0].startswith(f"node-{LORA_NODE_ID}-callbacks")
+    assert lora.callback_metrics().completed == 2
@@ -0,0 +1,108 @@
+import errno
+
+import can
+import pytest
+
+from platform_dbc import capture_file
+from platform_dbc.capture_file import CaptureReader, CaptureRecorder
+from platform_dbc.message_types import MessageType
+from platform_dbc.modules import get_module_by_name
+
+LORA = get_module_by_name("LORA")
+OBC = get_module_by_name("OBC_CM")
+
+
+def _frame(timestamp, arbitration_id, extended=True, fd=False):
+    return can.Message(
+        timestamp=timestamp,
+        arbitration_id=arbitration_id,
+        is_extended_id=extended,
+        is_fd=fd,
+        data=bytes(range(48 if fd else 8)),
+    )
+
+
+@pytest.fixture
+def capture(tmp_path):
+    path = str(tmp_path / "test.wcap")
+    lora_hb = LORA.get_message_id(15, MessageType.HEARTBEAT)
+    obc_status = OBC.get_message_id(15, MessageType.STATUS)
+    frames = []
+    for i in range(3000):
+        if i < 1000:
+            frames.append(_frame(i * 0.01, lora_hb))
+        elif i < 2000:
+            frames.append(_frame(i * 0.01, obc_status, fd=True))
+        else:
+            frames.append(_frame(i * 0.01, 0x703, extended=False))
+    with CaptureRecorder(path, block_size=4096) as recorder:
+        for frame in frames:
+            recorder.on_message_received(frame)
+    return path, frames
+
+
+def test_round_trip(capture):
+    path, frames = capture
+    reader = CaptureReader(path)
+
+    assert reader.frame_count == len(frames)
+    assert len(reader.blocks) > 10
+    for original, read in zip(frames, reader.read(), strict=True):
+        assert read.timestamp == original.timestamp
+        assert read.arbitration_id == original.arbitration_id
+        assert read.is_extended_id == original.is_extended_id
+        assert read.is_fd == original.is_fd
+        assert read.data == original.data
+
+
+def test_time_range_reads_only_overlapping_blocks(capture):
+    path, _ = capture
+    reader = CaptureReader(path)
+
+    frames = list(reader.read(start=5.0, end=6.0))
+
+    assert [f.timestamp for f in frames] == pytest.approx(
+        [i * 0.01 for i in range(500, 601)]
+    )
+    assert len(reader.select_blocks(5.0, 6.0)) < len(reader.blocks) // 5
+
+
+def test_source_and_type_filter(capture):
+    path, _ = capture
+    reader = CaptureReader(path)
+
+    blocks = reader.select_blocks(source_id=OBC.id)
+    frames = list(reader.read(source_id=OBC.id))
+
+    assert len(frames) == 1000
+    assert all((OBC.id, MessageType.STATUS.value) in b.keys for b in blocks)
+    assert len(blocks) < len(reader.blocks)
+    assert not list(
+        reader.read(source_id=OBC.id, message_type=MessageType.HEARTBEAT)
+    )
+    lora = list(reader.read(end=2.0, message_type=MessageType.HEARTBEAT))
+    assert len(lora) == 201
+    assert {f.arbitration_id & 0x0F for f in lora} == {LORA.id}
+
+
+def test_other_frames_are_counted(capture):
+    path, _ = capture
+    reader = CaptureReader(path)
+
+    assert sum(b.other for b in reader.blocks) == 1000
+
+
+def test_writer_errors_are_raised(tmp_path, monkeypatch):
+    def disk_full(data, level):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(capture_file.zlib, "compress", disk_full)
+    recorder = CaptureRecorder(str(tmp_path / "full.wcap"), block_size=64)
+    for i in range(4):
+        recorder.on_message_received(_frame(i, 0xFFF3))
+    recorder._writer.join(timeout=5)
+
+    with pytest.raises(OSError):
+        recorder.on_message_received(_frame(5, 0xFFF3))
+    with pytest.raises(OSError):
+        recorder.stop()
@@ -0,0 +1,158 @@
+import os
+
+from platform_dbc import capture_pipeline
+from platform_dbc.capture_pipeline import (
+    PARTS_DIR,
+    decode_captures,
+    parse_candump_line,
+    plan_chunks,
+    read_column,
+)
+
+LORA_HEARTBEAT_ID = 0xFFF3
+OBC_HEARTBEAT_ID = 0xFFFC
+
+
+def _write_capture(path, frames):
+    with open(path, "w", encoding="ascii") as f:
+        for timestamp, frame_id, value in frames:
+            payload = value.to_bytes(4, "little").hex().upper()
+            f.write(f"({timestamp:.6f}) vcan0 {frame_id:08X}#{payload}\n")
+
+
+def test_parse_candump_line():
+    assert parse_candump_line(b"(1.5) vcan0 0000FFF3#01020304\n") == (
+        1.5,
+        0xFFF3,
+        b"\x01\x02\x03\x04",
+    )
+    assert parse_candump_line(b"(1.5) can0 0000FFF3##101020304\n") == (
+        1.5,
+        0xFFF3,
+        b"\x01\x02\x03\x04",
+    )
+    assert parse_candump_line(b"(1.5) vcan0 0000FFF3#R\n") is None
+    assert parse_candump_line(b"\n") is None
+
+
+def test_chunks_end_on_frame_boundaries(tmp_path):
+    capture = tmp_path / "a.log"
+    _write_capture(capture, [(i, LORA_HEARTBEAT_ID, i) for i in range(50)])
+    data = capture.read_bytes()
+
+    chunks = plan_chunks([str(capture)], chunk_size=100)
+
+    assert len(chunks) > 1
+    assert chunks[0].start == 0 and chunks[-1].end == len(data)
+    for chunk in chunks[1:]:
+        assert data[chunk.start - 1 : chunk.start] == b"\n"
+
+
+def test_decode_captures_merges_in_timestamp_order(tmp_path):
+    first = tmp_path / "a.log"
+    second = tmp_path / "b.log"
+    _write_capture(first, [(i, LORA_HEARTBEAT_ID, i) for i in range(0, 40, 2)])
+    _write_capture(
+        second,
+        [(i, LORA_HEARTBEAT_ID, i) for i in range(1, 40, 2)]
+        + [(100, OBC_HEARTBEAT_ID, 7), (101, 0x123, 0)],
+    )
+    output = tmp_path / "out"
+
+    manifest = decode_captures(
+        [str(first), str(second)],
+        str(output),
+        workers=2,
+        chunk_size=64,
+    )
+
+    assert manifest["skipped_frames"] == 1
+    assert manifest["messages"]["LORA_Heartbeat"]["rows"] == 40
+    timestamps = read_column(str(output), "LORA_Heartbeat", "timestamp")
+    values = read_column(str(output), "LORA_Heartbeat", "unix_timestamp")
+    assert list(timestamps) == list(range(40))
+    assert list(values) == list(range(40))
+    assert list(read_column(str(output), "OBC_CM_Heartbeat", "unix_timestamp"))
+    assert not os.path.exists(output / PARTS_DIR)
+
+
+def test_decode_captures_resumes(tmp_path):
+    capture = tmp_path / "a.log"
+    _write_capture(capture, [(i, LORA_HEARTBEAT_ID, i) for i in range(30)])
+    output = tmp_path / "out"
+    parts_dir = str(output / PARTS_DIR)
+
+    # Pretend an earlier run finished the first chunk before being killed
+    chunks = capture_pipeline._load_plan(
+        parts_dir, [str(capture)], chunk_size=128, dbc_path="wust-sat.dbc"
+    )
+    capture_pipeline._init_worker("wust-sat.dbc")
+    capture_pipeline._save_part(
+        parts_dir, 0, capture_pipeline.decode_chunk(chunks[0])
+    )
+
+    decode_captures([str(capture)], str(output), workers=1, chunk_size=128)
+
+    values = read_column(str(output), "LORA_Heartbeat", "unix_timestamp")
+    assert list(values) == list(range(30))
+
+
+def test_decode_captures_discards_parts_of_modified_capture(tmp_path):
+    capture = tmp_path / "a.log"
+    _write_capture(capture, [(i, LORA_HEARTBEAT_ID, i) for i in range(30)])
+    output = tmp_path / "out"
+    parts_dir = str(output / PARTS_DIR)
+
+    chunks = capture_pipeline._load_plan(
+        parts_dir, [str(capture)], chunk_size=4096, dbc_path="wust-sat.dbc"
+    )
+    capture_pipeline._init_worker("wust-sat.dbc")
+    capture_pipeline._save_part(
+        parts_dir, 0, capture_pipeline.decode_chunk(chunks[0])
+    )
+    # The capture keeps growing after the interrupted run
+    _write_capture(capture, [(i, LORA_HEARTBEAT_ID, i) for i in range(100)])
+
+    manifest = decode_captures(
+        [str(capture)], str(output), workers=1, chunk_size=4096
+    )
+
+    values = read_column(str(output), "LORA_Heartbeat", "unix_timestamp")
+    assert list(values) == list(range(100))
+    assert manifest["messages"]["LORA_Heartbeat"]["rows"] == 100
+
+
+def test_merge_streams_busy_capture_overlapped_by_quiet_one(
+    tmp_path, monkeypatch
+):
+    busy = tmp_path / "busy.log"
+    quiet = tmp_path / "quiet.log"
+    busy_frames = [(i / 100, LORA_HEARTBEAT_ID, i) for i in range(2000)]
+    # Spans the whole busy capture, so all of its parts overlap it
+    quiet_frames = [
+        (i * 2.0 + 0.005, LORA_HEARTBEAT_ID, 10_000 + i) for i in range(10)
+    ]
+    _write_capture(busy, busy_frames)
+    _write_capture(quiet, quiet_frames)
+    monkeypatch.setattr(capture_pipeline, "MERGE_BATCH_ROWS", 50)
+    slices = []
+    read_slice = capture_pipeline._read_column_slice
+
+    def spy(directory, column, start, count):
+        values = read_slice(directory, column, start, count)
+        slices.append(len(values))
+        return values
+
+    monkeypatch.setattr(capture_pipeline, "_read_column_slice", spy)
+
+    output = tmp_path / "out"
+    manifest = decode_captures(
+        [str(busy), str(quiet)], str(output), workers=1, chunk_size=4096
+    )
+
+    assert manifest["messages"]["LORA_Heartbeat"]["rows"] == 2010
+    values = list(read_column(str(output), "LORA_Heartbeat", "unix_timestamp"))
+    assert values == [v for _, _, v in sorted(busy_frames + quiet_frames)]
+    timestamps = read_column(str(output), "LORA_Heartbeat", "timestamp")
+    assert list(timestamps) == sorted(timestamps)
+    assert max(slices) <= 50
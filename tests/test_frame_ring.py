@@ -0,0 +1,180 @@
+import multiprocessing
+import threading
+import time
+
+import can
+import cantools
+import pytest
+from cantools.database.can import Message, Signal
+
+from platform_dbc.can_database import create_can_database
+from platform_dbc.frame_ring import FrameRing, RingReader, receive_frames
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing.create(capacity=8, max_signals=2)
+    yield ring
+    ring.close()
+
+
+def _consume(name, count, results):
+    ring = FrameRing.attach(name)
+    reader = RingReader(ring, from_start=True)
+    records = reader.read_batch(count)
+    results.put([(r.sequence, r.frame_id, r.values) for r in records])
+    ring.close()
+
+
+def test_publish_and_read(ring):
+    reader = RingReader(ring)
+    ring.publish(1.0, 0xFFF3, (10,))
+    ring.publish(2.0, 0xFFFC, (20, 21))
+
+    first, second = reader.read_batch()
+
+    assert (first.sequence, first.timestamp, first.frame_id) == (
+        0,
+        1.0,
+        0xFFF3,
+    )
+    assert first.values == (10.0,)
+    assert second.values == (20.0, 21.0)
+    assert reader.read() is None
+    assert reader.lost == 0
+
+
+def test_slow_reader_detects_overrun(ring):
+    slow = RingReader(ring)
+    for i in range(20):
+        ring.publish(float(i), 0xFFF3, (i,))
+
+    records = slow.read_batch()
+
+    assert slow.lost == 12
+    assert [r.values[0] for r in records] == list(range(12, 20))
+
+
+def test_too_many_signals(ring):
+    with pytest.raises(ValueError):
+        ring.publish(0.0, 0xFFF3, (1, 2, 3))
+
+
+def test_consumers_in_other_processes(ring):
+    for i in range(5):
+        ring.publish(float(i), 0xFFF3, (i,))
+    results = multiprocessing.Queue()
+    consumers = [
+        multiprocessing.Process(target=_consume, args=(ring.name, 5, results))
+        for _ in range(2)
+    ]
+    for consumer in consumers:
+        consumer.start()
+    for consumer in consumers:
+        consumer.join(timeout=10)
+
+    expected = [(i, 0xFFF3, (float(i),)) for i in range(5)]
+    assert results.get(timeout=1) == expected
+    assert results.get(timeout=1) == expected
+
+
+def test_receive_frames_decodes_once(ring):
+    db = create_can_database()
+    db.refresh()
+    reader = RingReader(ring)
+    stop = threading.Event()
+    with (
+        can.Bus(interface="virtual", channel="ring") as rx,
+        can.Bus(interface="virtual", channel="ring") as tx,
+    ):
+        receiver = threading.Thread(
+            target=receive_frames, args=(rx, db, ring, stop, 0.01)
+        )
+        receiver.start()
+        tx.send(
+            can.Message(
+                arbitration_id=0xFFF3, data=(1234).to_bytes(4, "little")
+            )
+        )
+        tx.send(can.Message(arbitration_id=0x123, data=b"\x00"))
+        deadline = time.monotonic() + 5
+        while ring.head < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stop.set()
+        receiver.join()
+
+    record = reader.read()
+    assert (record.frame_id, record.values) == (0xFFF3, (1234.0,))
+    assert reader.read() is None
+
+
+def test_receive_frames_rate_limits_decode_errors(ring, caplog):
+    db = create_can_database()
+    db.refresh()
+    stop = threading.Event()
+    result = []
+    with (
+        can.Bus(interface="virtual", channel="ring-errors") as rx,
+        can.Bus(interface="virtual", channel="ring-errors") as tx,
+    ):
+        receiver = threading.Thread(
+            target=lambda: result.append(
+                receive_frames(rx, db, ring, stop, 0.01)
+            )
+        )
+        receiver.start()
+        for _ in range(50):
+            tx.send(can.Message(arbitration_id=0xFFF3, data=b"\x01"))
+        tx.send(
+            can.Message(arbitration_id=0xFFF3, data=(7).to_bytes(4, "little"))
+        )
+        deadline = time.monotonic() + 5
+        while ring.head < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stop.set()
+        receiver.join()
+
+    assert result == [50]
+    assert len(caplog.records) == 1
+    assert ring.head == 1
+
+
+def test_receive_frames_skips_messages_wider_than_the_ring(ring):
+    # The ring fixture holds 2 values per record
+    platform_db = create_can_database()
+    platform_db.refresh()
+    heartbeat = platform_db.get_message_by_frame_id(0xFFF3)
+    wide = Message(
+        frame_id=0xFFFC,
+        name="Wide",
+        length=3,
+        signals=[Signal(f"s{i}", 8 * i, 8) for i in range(3)],
+        is_extended_frame=True,
+    )
+    db = cantools.database.Database(messages=[heartbeat, wide])
+    db.refresh()
+    stop = threading.Event()
+    result = []
+    with (
+        can.Bus(interface="virtual", channel="ring-wide") as rx,
+        can.Bus(interface="virtual", channel="ring-wide") as tx,
+    ):
+        receiver = threading.Thread(
+            target=lambda: result.append(
+                receive_frames(rx, db, ring, stop, 0.01)
+            )
+        )
+        receiver.start()
+        tx.send(can.Message(arbitration_id=0xFFFC, data=b"\x01\x02\x03"))
+        tx.send(
+            can.Message(arbitration_id=0xFFF3, data=(7).to_bytes(4, "little"))
+        )
+        deadline = time.monotonic() + 5
+        while ring.head < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stop.set()
+        receiver.join()
+
+    assert result == [1]
+    record = RingReader(ring, from_start=True).read()
+    assert (record.frame_id, record.values) == (0xFFF3, (7.0,))
@@ -0,0 +1,102 @@
+import os
+import time
+
+import pytest
+
+from platform_dbc.can_database import create_can_database
+from platform_dbc.live_database import LiveDatabase
+
+LORA_HEARTBEAT_ID = 0xFFF3
+OBC_HEARTBEAT_ID = 0xFFFC
+
+NEW_MESSAGE = """
+BO_ 2147483699 LORA_Status: 1 LORA
+ SG_ mode : 0|8@1+ (1,0) [0|0] "" Vector__XXX
+"""
+
+
+@pytest.fixture
+def dbc_path(tmp_path):
+    path = tmp_path / "test.dbc"
+    path.write_text(create_can_database().as_dbc_string())
+    return path
+
+
+def _rewrite(path, text):
+    path.write_text(text)
+    # Make sure the change is visible even on coarse mtime filesystems
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_reload_replaces_only_changed_messages(dbc_path):
+    db = LiveDatabase(str(dbc_path))
+    lora = db.get_message_by_frame_id(LORA_HEARTBEAT_ID)
+    obc = db.get_message_by_frame_id(OBC_HEARTBEAT_ID)
+
+    text = dbc_path.read_text()
+    text = text.replace(
+        "BO_ 2147549171 LORA_Heartbeat: 4 LORA\n"
+        ' SG_ unix_timestamp : 0|32@1+ (1,0) [0|0] "s"',
+        "BO_ 2147549171 LORA_Heartbeat: 4 LORA\n"
+        ' SG_ unix_timestamp : 0|32@1+ (2,0) [0|0] "s"',
+    )
+    text = text.replace("\nBO_ 2147549180", NEW_MESSAGE + "\nBO_ 2147549180")
+    dbc_path.write_text(text)
+
+    result = db.reload()
+
+    assert result.changed == {"LORA_Heartbeat"}
+    assert result.added == {"LORA_Status"}
+    assert not result.removed
+    assert db.generation == 2
+    assert db.get_message_by_frame_id(OBC_HEARTBEAT_ID) is obc
+    assert db.get_message_by_frame_id(LORA_HEARTBEAT_ID) is not lora
+    assert db.decode_message(LORA_HEARTBEAT_ID, b"\x02\x00\x00\x00") == {
+        "unix_timestamp": 4
+    }
+    assert db.get_message_by_name("LORA_Status").frame_id == 0x33
+
+
+def test_reload_without_changes(dbc_path):
+    db = LiveDatabase(str(dbc_path))
+
+    assert not db.reload()
+    assert db.generation == 1
+
+
+def test_watcher_picks_up_changes(dbc_path):
+    db = LiveDatabase(str(dbc_path), poll_interval=0.01)
+    results = []
+    db.add_listener(results.append)
+
+    with db:
+        _rewrite(dbc_path, dbc_path.read_text() + NEW_MESSAGE)
+        deadline = time.monotonic() + 5
+        while not results and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    assert results[0].added == {"LORA_Status"}
+
+
+def test_broken_dbc_keeps_old_definitions(dbc_path, caplog):
+    db = LiveDatabase(str(dbc_path))
+
+    _rewrite(dbc_path, "BO_ this is not a dbc")
+
+    assert db.check_for_changes() is None
+    assert db.generation == 1
+    assert db.get_message_by_frame_id(LORA_HEARTBEAT_ID)
+    (record,) = caplog.records
+    assert record.name == "platform_dbc.live_database"
+    assert record.exc_info is not None
+
+
+def test_generated_database():
+    db = LiveDatabase()
+
+    assert {m.name for m in db.messages} == {
+        "LORA_Heartbeat",
+        "OBC_CM_Heartbeat",
+    }
+    assert db.check_for_changes() is None
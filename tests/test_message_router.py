@@ -0,0 +1,164 @@
+import asyncio
+import threading
+import time
+
+import can
+import pytest
+
+from platform_dbc.can_database import create_can_database
+from platform_dbc.message_router import BROADCAST_ID, MessageRouter
+from platform_dbc.message_types import MessageType
+from platform_dbc.modules import get_module_by_name
+
+LORA = get_module_by_name("LORA")
+OBC = get_module_by_name("OBC_CM")
+
+
+@pytest.fixture(scope="module")
+def db():
+    db = create_can_database()
+    db.refresh()
+    return db
+
+
+def _frame(db, module, message_type):
+    frame_id = module.get_message_id(BROADCAST_ID, message_type)
+    message = db.get_message_by_frame_id(frame_id)
+    return can.Message(
+        arbitration_id=frame_id,
+        is_extended_id=True,
+        data=bytes(message.length),
+    )
+
+
+def test_wildcards_and_broadcast(db):
+    router = MessageRouter(db)
+    everything, from_lora, to_obc, broadcast = [], [], [], []
+    router.subscribe(everything.append)
+    router.subscribe(from_lora.append, source_id=LORA.id)
+    router.subscribe(to_obc.append, destination_id=OBC.id)
+    router.subscribe(broadcast.append, destination_id=BROADCAST_ID)
+
+    assert router.route(_frame(db, LORA, MessageType.HEARTBEAT)) == 4
+    assert router.route(_frame(db, OBC, MessageType.HEARTBEAT)) == 3
+
+    assert [m.name for m in everything] == [
+        "LORA_Heartbeat",
+        "OBC_CM_Heartbeat",
+    ]
+    assert [m.source_id for m in from_lora] == [LORA.id]
+    # Broadcast frames reach subscribers of any single destination
+    assert len(to_obc) == len(broadcast) == 2
+    assert everything[0].message_type is MessageType.HEARTBEAT
+    assert everything[0].destination_id == BROADCAST_ID
+    assert everything[0].signals.keys() == set(
+        db.get_message_by_name("LORA_Heartbeat").signal_tree
+    )
+
+
+def test_type_filter_and_unsubscribe(db):
+    router = MessageRouter(db)
+    heartbeats, statuses = [], []
+    subscription = router.subscribe(
+        heartbeats.append, message_type=MessageType.HEARTBEAT
+    )
+    router.subscribe(statuses.append, message_type=MessageType.STATUS)
+
+    router.route(_frame(db, OBC, MessageType.HEARTBEAT))
+    router.unsubscribe(subscription)
+    router.route(_frame(db, OBC, MessageType.HEARTBEAT))
+
+    assert [m.source_id for m in heartbeats] == [OBC.id]
+    assert not statuses
+
+
+def test_unknown_and_standard_frames_are_ignored(db):
+    router = MessageRouter(db)
+    received = []
+    router.subscribe(received.append)
+
+    assert router.route(can.Message(arbitration_id=0x703, data=[5])) == 0
+    assert (
+        router.route(can.Message(arbitration_id=0x3F, is_extended_id=True))
+        == 0
+    )
+    assert not received
+
+
+def test_bad_frames_and_failing_subscribers_do_not_stop_routing(db):
+    router = MessageRouter(db)
+    received = []
+
+    def fail(message):
+        raise RuntimeError("subscriber bug")
+
+    router.subscribe(fail)
+    router.subscribe(received.append)
+    with (
+        can.Bus(interface="virtual", channel="router") as rx,
+        can.Bus(interface="virtual", channel="router") as tx,
+    ):
+        notifier = can.Notifier(rx, [router], timeout=0.01)
+        # Wrong DLC for the 4 byte heartbeat
+        tx.send(can.Message(arbitration_id=0xFFF3, data=b"\x01"))
+        tx.send(_frame(db, LORA, MessageType.HEARTBEAT))
+        deadline = time.monotonic() + 5
+        while not received and time.monotonic() < deadline:
+            time.sleep(0.01)
+        notifier.stop()
+
+    assert notifier.exception is None
+    assert [m.name for m in received] == ["LORA_Heartbeat"]
+    assert router.decode_errors == 1
+    assert router.subscriber_errors == 1
+
+
+def test_invalid_ids_are_rejected(db):
+    router = MessageRouter(db)
+    with pytest.raises(ValueError):
+        router.subscribe(print, source_id=16)
+
+
+def test_queue_backpressure_from_thread(db):
+    router = MessageRouter(db)
+    frame = _frame(db, LORA, MessageType.HEARTBEAT)
+
+    async def main():
+        queue = asyncio.Queue(maxsize=1)
+        router.subscribe_queue(queue, source_id=LORA.id)
+        producer = threading.Thread(
+            target=lambda: [router.route(frame) for _ in range(5)]
+        )
+        producer.start()
+        received = []
+        for _ in range(5):
+            received.append(await queue.get())
+            await asyncio.sleep(0.01)
+            # The producer waits for space instead of dropping
+            assert queue.qsize() <= 1
+        await asyncio.to_thread(producer.join)
+        return received
+
+    received = asyncio.run(main())
+    assert len(received) == 5
+    assert router.dropped == 0
+
+
+def test_route_async_waits_for_space(db):
+    router = MessageRouter(db)
+    frame = _frame(db, LORA, MessageType.HEARTBEAT)
+
+    async def main():
+        queue = asyncio.Queue(maxsize=1)
+        router.subscribe_queue(queue)
+        await router.route_async(frame)
+        blocked = asyncio.ensure_future(router.route_async(frame))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        await queue.get()
+        assert await blocked == 1
+        # route() on the loop thread cannot wait, so it drops
+        assert router.route(frame) == 0
+
+    asyncio.run(main())
+    assert router.dropped == 1
@@ -0,0 +1,94 @@
+import cantools
+import pytest
+from cantools.database.can import Message, Signal
+from cantools.database.conversion import BaseConversion
+
+from platform_dbc.can_database import create_can_database
+from platform_dbc.message_types import MessageType
+from platform_dbc.modules import get_module_by_name, parse_message_id
+from platform_dbc.telemetry_batch import (
+    TelemetryRecord,
+    decode_batch,
+    encode_batch,
+    raw_frame_size,
+)
+
+
+@pytest.fixture
+def db():
+    db = create_can_database()
+    db.refresh()
+    return db
+
+
+def _heartbeat(module_name: str, timestamp_ms: int) -> TelemetryRecord:
+    module = get_module_by_name(module_name)
+    return TelemetryRecord(
+        timestamp=timestamp_ms / 1000,
+        frame_id=module.get_message_id(15, MessageType.HEARTBEAT),
+        signals={"unix_timestamp": timestamp_ms // 1000},
+    )
+
+
+def test_parse_message_id_round_trip():
+    lora = get_module_by_name("LORA")
+    can_id = lora.get_message_id(12, MessageType.HEARTBEAT)
+    assert parse_message_id(can_id) == (lora.id, 12, MessageType.HEARTBEAT)
+
+
+def test_parse_message_id_rejects_unknown_type():
+    with pytest.raises(ValueError):
+        parse_message_id(0x4213)
+
+
+def test_batch_round_trip(db):
+    records = [
+        _heartbeat(name, 1_700_000_000_000 + second * 1000 + offset)
+        for second in range(20)
+        for offset, name in enumerate(["LORA", "OBC_CM"])
+    ]
+    # Out of order records must survive as well
+    records[3], records[4] = records[4], records[3]
+
+    data = encode_batch(db, records)
+
+    assert decode_batch(db, data) == records
+    assert len(data) < sum(raw_frame_size(db, r.frame_id) for r in records)
+
+
+def test_empty_batch(db):
+    assert decode_batch(db, encode_batch(db, [])) == []
+
+
+def test_truncated_batch(db):
+    data = encode_batch(db, [_heartbeat("LORA", 1_700_000_000_000)])
+    with pytest.raises(ValueError):
+        decode_batch(db, data[:-1])
+
+
+def test_scaled_float_signal_round_trip():
+    lora = get_module_by_name("LORA")
+    frame_id = lora.get_message_id(15, MessageType.HEARTBEAT)
+    temperature = Signal(
+        "temperature",
+        0,
+        32,
+        conversion=BaseConversion.factory(
+            scale=0.5, offset=-40, is_float=True
+        ),
+    )
+    db = cantools.database.Database(
+        messages=[
+            Message(
+                frame_id=frame_id,
+                name="LORA_Heartbeat",
+                length=4,
+                signals=[temperature],
+                is_extended_frame=True,
+            )
+        ]
+    )
+    db.refresh()
+    records = [TelemetryRecord(1.0, frame_id, {"temperature": 21.5})]
+
+    assert decode_batch(db, encode_batch(db, records)) == records
@@ -0,0 +1,78 @@
+import canopen
+import pytest
+
+from platform_canopen.lora_node import LORA_NODE_ID, LoraNode
+from platform_canopen.obc_node import OBC_NODE_ID, ObcNode
+from platform_canopen.virtual_time import EventScheduler, VirtualCanBus
+
+
+def test_scheduler_runs_events_in_time_order():
+    scheduler = EventScheduler()
+    calls = []
+    scheduler.call_at(2.0, calls.append, "b")
+    scheduler.call_at(1.0, calls.append, "a")
+    scheduler.call_at(2.0, calls.append, "c")
+    scheduler.call_at(3.0, calls.append, "cancelled").cancel()
+
+    scheduler.run(until=10.0)
+
+    assert calls == ["a", "b", "c"]
+    assert scheduler.time() == 10.0
+
+
+def test_heartbeats_in_virtual_time():
+    bus = VirtualCanBus()
+    heartbeats = []
+    bus.add_listener(lambda msg: heartbeats.append(msg))
+    nodes = [LoraNode(virtual_bus=bus), ObcNode(virtual_bus=bus)]
+    for node in nodes:
+        node.start()
+
+    bus.scheduler.run(until=3600.5)
+    for node in nodes:
+        node.stop()
+
+    lora = [m for m in heartbeats if m.arbitration_id == 0x700 + LORA_NODE_ID]
+    obc = [m for m in heartbeats if m.arbitration_id == 0x700 + OBC_NODE_ID]
+    assert len(lora) == len(obc) == 3601
+    assert all(m.data == bytearray([0x05]) for m in lora + obc)
+    # Frames are serialized on the bus, one second apart per node
+    assert lora[1].timestamp - lora[0].timestamp == pytest.approx(1.0)
+    assert len({m.timestamp for m in heartbeats}) == len(heartbeats)
+
+
+def test_sdo_callbacks_in_virtual_time():
+    bus = VirtualCanBus()
+    lora = LoraNode(virtual_bus=bus)
+    obc = ObcNode(virtual_bus=bus)
+    lora.start()
+    obc.start()
+
+    master = canopen.Network()
+    bus.connect(master)
+    responses = []
+    for node_id in (LORA_NODE_ID, OBC_NODE_ID):
+        master.subscribe(0x580 + node_id, lambda *args: responses.append(args))
+
+    # Expedited download of 7 to LoRa 0x2000, upload of OBC 0x2000
+    bus.scheduler.call_at(
+        5.0,
+        master.send_message,
+        0x600 + LORA_NODE_ID,
+        bytes([0x2F, 0x00, 0x20, 0x00, 0x07, 0, 0, 0]),
+    )
+    bus.scheduler.call_at(
+        5.0,
+        master.send_message,
+        0x600 + OBC_NODE_ID,
+        bytes([0x40, 0x00, 0x20, 0x00, 0, 0, 0, 0]),
+    )
+    lora.run(duration=10.0)
+    obc.stop()
+    master.disconnect()
+
+    assert lora.control_value == 7
+    assert responses[0][1][0] == 0x60
+    assert responses[1][1][:5] == bytearray([0x4F, 0x00, 0x20, 0x00, 0x01])
+    assert 5.0 < responses[0][2] < responses[1][2] < 5.01
+    assert bus.scheduler.time() == 10.0